@@ -1,7 +1,11 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 import gspread
+from gspread.utils import absolute_range_name
 from oauth2client.service_account import ServiceAccountCredentials
+import asyncio
+import csv
+import io
 import os
 import json
 import random  # Make sure this is at the top of your file
@@ -9,6 +13,19 @@ from googletrans import Translator
 import pytz
 from datetime import datetime
 
+from sheets import (
+    BACKGROUND, BULK, INTERACTIVE, SHEETS_POLL_INTERVAL,
+    AsyncSpreadsheet, Match, SnapshotCache, TabEdits, pool_session, request_priority,
+)
+from league import (
+    PENDING_ITEMS, PairRecord, RegistrationIndex, ReviewQueue,
+    directory, leaderboard, match_index, player_records,
+)
+from members import UserCache
+from ratings import ELO_START, LADDER_MODE, EloEngine, GlickoEngine, sweep_report
+from mirror import SQLITE_MIRROR_PATH, MatchMirror
+from journal import JOURNAL_FLUSH_INTERVAL, WriteJournal
+
 OWNER_ID = 1035911200237699072 
 ALLOWED_CHANNEL_ID = 1456526135075537019
 
@@ -28,9 +45,15 @@ def owner_or_channel():
     return commands.check(predicate)
 
 # === DISCORD BOT SETUP ===
+class RankingsBot(commands.Bot):
+    async def close(self):
+        # Users were told "saved" already: push what is still queued first
+        await flush_before_exit()
+        await super().close()
+
 intents = discord.Intents.default()
 intents.message_content = True  # Required for reading message content
-bot = commands.Bot(command_prefix="!", intents=intents)
+bot = RankingsBot(command_prefix="!", intents=intents)
 bot.remove_command("help")  # keep this
 print("Loaded commands at import time:", list(bot.commands))
 
@@ -57,13 +80,20 @@ def setup_google_sheets():
 
         creds_dict = json.loads(creds_json)
         creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
+        # One client for the whole process: its session refreshes the token
+        # on its own and keeps connections alive between requests
         client = gspread.authorize(creds)
+        pool_session(client)
 
-        # Open the specific spreadsheet
+        # Open the specific spreadsheet (by key when known, skipping the Drive search)
+        spreadsheet_key = os.getenv("SPREADSHEET_KEY")
         spreadsheet_name = os.getenv("SPREADSHEET_NAME", "1v1 Rankings")
-        sheet = client.open(spreadsheet_name).sheet1
+        if spreadsheet_key:
+            sheet = client.open_by_key(spreadsheet_key).sheet1
+        else:
+            sheet = client.open(spreadsheet_name).sheet1
 
-        print(f"✅ Successfully connected to Google Sheets: {spreadsheet_name}")
+        print(f"✅ Successfully connected to Google Sheets: {sheet.spreadsheet.title}")
         return sheet
 
     except Exception as e:
@@ -72,6 +102,46 @@ def setup_google_sheets():
 
 # Initialize Google Sheets connection
 sheet = setup_google_sheets()
+# Awaitable view of the same spreadsheet; all command I/O goes through it
+spreadsheet = AsyncSpreadsheet(sheet) if sheet else None
+# Shared in-memory copy of the read-heavy tabs; writers invalidate it
+snapshot_cache = SnapshotCache(spreadsheet) if spreadsheet else None
+# Optional indexed SQLite copy of Match History (SQLITE_MIRROR_PATH)
+match_mirror = MatchMirror(SQLITE_MIRROR_PATH) if spreadsheet and SQLITE_MIRROR_PATH else None
+# Reports, registrations and name changes are queued here and flushed in batches
+write_journal = WriteJournal()
+if snapshot_cache:
+    write_journal.on_flushed = lambda tabs: snapshot_cache.invalidate(*tabs)
+write_journal.on_dead_letter = lambda entries, error: asyncio.ensure_future(report_dead_letters(entries, error))
+# Accepted player name <-> Discord ID, kept current by register / doadmin
+registrations = RegistrationIndex()
+# Resolved Discord users, so repeat mentions skip the REST API
+user_cache = UserCache(bot)
+# Elo replayed from Match History, then updated as reports are accepted
+elo_engine = EloEngine()
+# Optional Glicko-2 ladder, recomputed per batch of rating periods
+glicko_engine = GlickoEngine()
+# Which engine the rating commands read (admins switch it with !laddermode)
+ladder_mode = LADDER_MODE if LADDER_MODE in ("elo", "glicko") else "elo"
+
+async def active_ladder(snapshot):
+    """The rating engine selected by ladder_mode, synced to the snapshot"""
+    engine = glicko_engine if ladder_mode == "glicko" else elo_engine
+    return await engine.sync(snapshot)
+
+def replaces_sheet_elo(ratings):
+    """
+    Whether to show the engine's ratings where Sheet1 has a Current Elo.
+    Glicko-2 is its own scale; local Elo only once it reproduces the sheet.
+    """
+    return ratings is glicko_engine or elo_engine.verified
+# Rows awaiting review per tab, rebuilt only when that tab is re-downloaded
+review_queues = {title: ReviewQueue(title) for title in PENDING_ITEMS}
+
+async def open_review(title):
+    """Push queued submissions to Sheets, then return the tab's pending queue"""
+    await write_journal.flush(spreadsheet)
+    return review_queues[title].sync(await snapshot_cache.get())
 
 # === BOT COMMANDS ===
 @bot.command(name="help")
@@ -101,7 +171,7 @@ async def help_command(ctx, command_name=None):
     # Stats
     embed.add_field(
         name="📊 Stats",
-        value="`playerelo`, `stats`, `elo`, `top10`, `headtohead`, `gamesbyplayer`",
+        value="`playerelo`, `stats`, `elo`, `elohistory`, `rank`, `top10`, `leaderboard`, `headtohead`, `gamesbyplayer`, `predict`",
         inline=False
     )
 
@@ -144,7 +214,7 @@ async def help_command(ctx, command_name=None):
     if ctx.channel.id == ALLOWED_CHANNEL_ID:
         embed.add_field(
             name="🔐 Admin",
-            value="`doadmin`, `reviewreports`, `reviewnames`",
+            value="`doadmin`, `reviewreports`, `reviewnames`, `pending`, `elosweep`, `laddermode`",
             inline=False
         )
 
@@ -178,17 +248,17 @@ async def playerelo(ctx, *, player_name=None):
     try:
         # Send typing indicator
         async with ctx.typing():
-            # Fetch all records from the sheet
-            data = sheet.get_all_records()
-
-            # Search for the player (case-insensitive)
-            player_match = None
-            for player_data in data:
-                if player_data.get("Player", "").lower() == player_name.lower():
-                    player_match = player_data
-                    break
-
-            if not player_match:
+            # Resolve any current or past name to the player's ID
+            snapshot = await snapshot_cache.get()
+            players = directory(snapshot)
+            ratings = await active_ladder(snapshot)
+            stats = (await elo_engine.sync(snapshot)).stats
+            player_id = players.id_of(player_name)
+            player_match = player_records(snapshot).get(player_id) if player_id is not None else None
+            if player_match is None and player_id in ratings.ratings:
+                player_match = {}  # rated from Match History, not on Sheet1 yet
+
+            if player_match is None:
                 # Create embed for player not found
                 embed = discord.Embed(
                     title="❌ Player Not Found",
@@ -204,12 +274,22 @@ async def playerelo(ctx, *, player_name=None):
                 return
 
             # Extract player statistics
-            actual_player_name = player_match.get("Player", "Unknown")
-            elo = player_match.get("Current Elo", "N/A")
-            games = player_match.get("Games", "N/A")
-            record = player_match.get("Record", "N/A")
-            kdr = player_match.get("K/D Ratio", "N/A")
-            streak = player_match.get("Streak", "N/A")
+            actual_player_name = players.display_name(player_id)
+            if player_id in ratings.ratings and (
+                replaces_sheet_elo(ratings) or "Current Elo" not in player_match
+            ):
+                elo = ratings.describe(player_id)
+            else:
+                elo = player_match.get("Current Elo", "N/A")
+            if player_id in stats:
+                # Computed from accepted match scores, current as of the last accept
+                line = stats.get(player_id)
+                games, record, kdr, streak = line["games"], line["record"], line["kd"], line["streak"]
+            else:
+                games = player_match.get("Games", "N/A")
+                record = player_match.get("Record", "N/A")
+                kdr = player_match.get("K/D Ratio", "N/A")
+                streak = player_match.get("Streak", "N/A")
 
             # Create rich embed for player stats
             embed = discord.Embed(
@@ -218,7 +298,7 @@ async def playerelo(ctx, *, player_name=None):
             )
 
             # Add fields for each stat
-            embed.add_field(name="🔢 Current Elo", value=str(elo), inline=True)
+            embed.add_field(name=f"🔢 Current {ratings.label}", value=str(elo), inline=True)
             embed.add_field(name="🎮 Games Played", value=str(games), inline=True)
             embed.add_field(name="📈 Win/Loss Record", value=str(record), inline=True)
             embed.add_field(name="⚔️ K/D Ratio", value=str(kdr), inline=True)
@@ -310,29 +390,13 @@ async def top10(ctx):
     try:
         # Send typing indicator
         async with ctx.typing():
-            # Get all column values (skip headers)
-            names = sheet.col_values(1)[1:]        # Column A - Player
-            elos_raw = sheet.col_values(3)[1:]     # Column C - Elo
-            games = sheet.col_values(4)[1:]        # Column D - Games
-            records = sheet.col_values(5)[1:]      # Column E - Record
-            win_percents = sheet.col_values(6)[1:] # Column F - Win %
-            kds = sheet.col_values(9)[1:]          # Column I - K/D
-            cleans = sheet.col_values(10)[1:]      # Column J - Clean Sheets
-            streaks = sheet.col_values(11)[1:]     # Column K - Streak
-
-            # Convert Elo to float and handle empty cells
-            elos = []
-            for elo in elos_raw:
-                try:
-                    elos.append(float(elo) if elo else 0.0)
-                except (ValueError, TypeError):
-                    elos.append(0.0)
+            # Leaderboard is parsed and ranked once per snapshot refresh
+            snapshot = await snapshot_cache.get()
+            board = leaderboard(snapshot)
+            ratings = await active_ladder(snapshot)
+            stats = (await elo_engine.sync(snapshot)).stats
 
-            # Ensure all lists are the same length
-            min_length = min(len(names), len(elos), len(games), len(records), 
-                           len(win_percents), len(kds), len(cleans), len(streaks))
-
-            if min_length == 0:
+            if len(board) == 0 and len(ratings) == 0:
                 embed = discord.Embed(
                     title="❌ No Data Available",
                     description="No player data found in the rankings database.",
@@ -341,49 +405,50 @@ async def top10(ctx):
                 await ctx.send(embed=embed)
                 return
 
-            # Trim lists to same length and combine
-            leaderboard_data = list(zip(
-                names[:min_length], 
-                elos[:min_length], 
-                games[:min_length], 
-                records[:min_length], 
-                win_percents[:min_length], 
-                kds[:min_length], 
-                cleans[:min_length], 
-                streaks[:min_length]
-            ))
-
-            # Sort by Elo (highest first) and take top 10
-            leaderboard = sorted(leaderboard_data, key=lambda x: x[1], reverse=True)[:10]
-
             # Create embed
             embed = discord.Embed(
                 title="🏆 Top 10 Leaderboard",
-                description="Players ranked by Elo rating",
+                description=f"Players ranked by {ratings.label} rating",
                 color=0x00ff00
             )
 
             # Add each player as a field
-            for i, (name, elo, g, rec, winp, kd, cs, st) in enumerate(leaderboard, 1):
+            if len(ratings) and (replaces_sheet_elo(ratings) or len(board) == 0):
+                # Live ratings and match-derived stats; Sheet1 only fills gaps
+                top = []
+                for pid in ratings.ranked(0, 10):
+                    p = board.find(pid) or {field: "N/A" for field in board.COLUMNS}
+                    p.update(stats.get(pid) or {})
+                    p["name"] = ratings.players.display_name(pid)
+                    p["rating"] = ratings.describe(pid)
+                    top.append(p)
+            else:
+                # Sheet1's own ranking and Current Elo
+                top = board.top(10)
+                for p in top:
+                    p.update(stats.get(p["id"]) or {})
+                    p["rating"] = f"{p['elo']:.1f}"
+
+            for i, p in enumerate(top, 1):
                 rank_emoji = "🥇" if i == 1 else "🥈" if i == 2 else "🥉" if i == 3 else f"{i}."
 
                 field_value = (
-                    f"🔢 **Elo:** {elo:.1f}\n"
-                    f"🎮 **Games:** {g}\n"
-                    f"🧾 **Record:** {rec}\n"
-                    f"🏅 **Win%:** {winp}\n"
-                    f"⚔️ **K/D:** {kd}\n"
-                    f"🧼 **Clean Sheets:** {cs}\n"
-                    f"🔥 **Streak:** {st}"
+                    f"🔢 **{ratings.label}:** {p['rating']}\n"
+                    f"🎮 **Games:** {p['games']}\n"
+                    f"🧾 **Record:** {p['record']}\n"
+                    f"🏅 **Win%:** {p['win_pct']}\n"
+                    f"⚔️ **K/D:** {p['kd']}\n"
+                    f"🧼 **Clean Sheets:** {p['clean_sheets']}\n"
+                    f"🔥 **Streak:** {p['streak']}"
                 )
 
                 embed.add_field(
-                    name=f"{rank_emoji} {name}",
+                    name=f"{rank_emoji} {p['name']}",
                     value=field_value,
                     inline=True
                 )
 
-            embed.set_footer(text="Rankings based on current Elo ratings")
+            embed.set_footer(text=f"Rankings based on current {ratings.label} ratings")
             await ctx.send(embed=embed)
 
     except Exception as e:
@@ -401,6 +466,197 @@ async def top10(ctx):
         )
         await ctx.send(embed=embed)
 
+# Players per !leaderboard page
+LEADERBOARD_PAGE_SIZE = 10
+
+@bot.command(name='rank')
+async def rank(ctx, *, player_name=None):
+    """
+    Show a player's leaderboard position, percentile and neighbours
+    Usage: !rank <player_name>
+    """
+    if not player_name:
+        await ctx.send("❌ Usage: `!rank <player_name>`")
+        return
+
+    try:
+        snapshot = await snapshot_cache.get()
+        ratings = await active_ladder(snapshot)
+        player_id = directory(snapshot).id_of(player_name)
+
+        if player_id not in ratings.ratings:
+            await ctx.send(f"❌ No rated matches found for player `{player_name}`.")
+            return
+
+        total = len(ratings)
+        position = ratings.rank(player_id)
+        percentile = 100.0 * (total - position - 1) / max(total - 1, 1)
+
+        embed = discord.Embed(
+            title=f"📊 Rank for {ratings.players.display_name(player_id)}",
+            description=(
+                f"**#{position + 1}** of {total} | "
+                f"**{ratings.label}:** {ratings.describe(player_id)} | "
+                f"**Percentile:** {percentile:.1f}"
+            ),
+            color=0x00ff00
+        )
+
+        # Two players either side of them
+        lines = []
+        start = max(position - 2, 0)
+        for i, pid in enumerate(ratings.ranked(start, 5), start + 1):
+            name = ratings.players.display_name(pid)
+            line = f"#{i} {name} — {ratings.describe(pid)}"
+            lines.append(f"**{line}**" if pid == player_id else line)
+        embed.add_field(name="Neighbours", value="\n".join(lines), inline=False)
+
+        await ctx.send(embed=embed)
+
+    except Exception as e:
+        await ctx.send("❌ Error fetching rank.")
+        print(f"Error in rank: {e}")
+
+@bot.command(name='leaderboard', aliases=['lb'])
+async def leaderboard_page(ctx, page: int = 1):
+    """
+    Show one page of the full leaderboard
+    Usage: !leaderboard <page>
+    """
+    try:
+        snapshot = await snapshot_cache.get()
+        ratings = await active_ladder(snapshot)
+        pages = max((len(ratings) + LEADERBOARD_PAGE_SIZE - 1) // LEADERBOARD_PAGE_SIZE, 1)
+
+        if len(ratings) == 0:
+            await ctx.send("❌ No rated players yet.")
+            return
+        if not 1 <= page <= pages:
+            await ctx.send(f"❌ Page must be between 1 and {pages}.")
+            return
+
+        start = (page - 1) * LEADERBOARD_PAGE_SIZE
+        lines = [
+            f"**#{i}** {ratings.players.display_name(pid)} — {ratings.describe(pid)} "
+            f"({ratings.games.get(pid, 0)} games)"
+            for i, pid in enumerate(ratings.ranked(start, LEADERBOARD_PAGE_SIZE), start + 1)
+        ]
+
+        embed = discord.Embed(
+            title=f"🏆 Leaderboard ({ratings.label})",
+            description="\n".join(lines),
+            color=0x00ff00
+        )
+        embed.set_footer(text=f"Page {page}/{pages} • !leaderboard <page>")
+        await ctx.send(embed=embed)
+
+    except Exception as e:
+        await ctx.send("❌ Error fetching leaderboard.")
+        print(f"Error in leaderboard: {e}")
+
+# Groups up to this size get the matrix inline; larger ones as a CSV file
+PREDICT_INLINE_PLAYERS = 8
+PREDICT_MAX_PLAYERS = 64
+
+@bot.command(name='predict')
+async def predict(ctx, *player_names):
+    """
+    Win chances from current Elo ratings. Two players: chance and rating
+    swing for each result. More: the round-robin probability matrix.
+    Usage: !predict <player1> <player2> [player3 ...]
+    """
+    if len(player_names) < 2:
+        await ctx.send("❌ Usage: `!predict <player1> <player2> [player3 ...]`")
+        return
+    if len(player_names) > PREDICT_MAX_PLAYERS:
+        await ctx.send(f"❌ At most {PREDICT_MAX_PLAYERS} players per prediction.")
+        return
+
+    try:
+        snapshot = await snapshot_cache.get()
+        ratings = await elo_engine.sync(snapshot)
+        players = directory(snapshot)
+
+        pids, unknown = [], []
+        for name in player_names:
+            pid = players.id_of(name)
+            if pid is None:
+                unknown.append(name)
+            elif pid not in pids:
+                pids.append(pid)
+        if unknown:
+            await ctx.send(f"❌ Unknown player(s): {', '.join(f'`{n}`' for n in unknown)}")
+            return
+        if len(pids) < 2:
+            await ctx.send("❌ Pick at least two different players.")
+            return
+
+        names = [players.display_name(pid) for pid in pids]
+
+        if len(pids) == 2:
+            p1, p2 = pids
+            chance = ratings.probability_matrix(pids)[0][1]
+            win, draw, loss = ratings.swing(p1, p2)
+            embed = discord.Embed(
+                title=f"🔮 {names[0]} vs {names[1]}",
+                color=0x00ff00
+            )
+            for name, pid, p, (w, d, l) in (
+                (names[0], p1, chance, (win, draw, loss)),
+                (names[1], p2, 1.0 - chance, (-loss, -draw, -win)),
+            ):
+                embed.add_field(
+                    name=f"{name} ({ratings.rating(pid):.1f})",
+                    value=(
+                        f"**Win chance:** {p * 100:.1f}%\n"
+                        f"Win {w:+.1f} / Draw {d:+.1f} / Loss {l:+.1f}"
+                    ),
+                    inline=True
+                )
+            embed.set_footer(text="Elo expected score; a draw counts as half a win")
+            await ctx.send(embed=embed)
+            return
+
+        matrix = ratings.probability_matrix(pids)
+        # Expected wins over a full round robin (the diagonal is NaN)
+        expected = [
+            sum(p for j, p in enumerate(row) if j != i) for i, row in enumerate(matrix.tolist())
+        ]
+        standings = sorted(range(len(pids)), key=lambda i: -expected[i])
+
+        embed = discord.Embed(
+            title=f"🔮 Group preview — {len(pids)} players",
+            description="\n".join(
+                f"**{n}.** {names[i]} ({ratings.rating(pids[i]):.1f}) — "
+                f"{expected[i]:.1f} expected wins"
+                for n, i in enumerate(standings, 1)
+            )[:4000],
+            color=0x00ff00
+        )
+
+        if len(pids) <= PREDICT_INLINE_PLAYERS:
+            short = [name[:6] for name in names]
+            lines = ["       " + " ".join(f"{s:>6}" for s in short)]
+            for i, row in enumerate(matrix.tolist()):
+                cells = " ".join("     —" if i == j else f"{p * 100:5.0f}%" for j, p in enumerate(row))
+                lines.append(f"{short[i]:>6} {cells}")
+            embed.add_field(name="Win % (row beats column)", value="```\n" + "\n".join(lines) + "\n```", inline=False)
+            await ctx.send(embed=embed)
+            return
+
+        out = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerow([""] + names)
+        for i, row in enumerate(matrix.tolist()):
+            writer.writerow([names[i]] + ["" if i == j else f"{p:.4f}" for j, p in enumerate(row)])
+        file = discord.File(io.BytesIO(out.getvalue().encode()), filename="predict_matrix.csv")
+        embed.set_footer(text="Full win-probability matrix attached (row beats column)")
+        await ctx.send(embed=embed, file=file)
+
+    except Exception as e:
+        await ctx.send("❌ Error computing predictions.")
+        print(f"Error in predict: {e}")
+
 @bot.command(name='headtohead', aliases=['h2h'])
 async def headtohead(ctx, player1=None, player2=None):
     """
@@ -428,17 +684,13 @@ async def headtohead(ctx, player1=None, player2=None):
         await ctx.send(embed=embed)
         return
 
-    # Normalize lookup strings for case-insensitive compare
-    p1_query = player1.strip().lower()
-    p2_query = player2.strip().lower()
-
     try:
         async with ctx.typing():
-            # Try to open the "Match History" worksheet inside the same spreadsheet
+            # Load the shared snapshot (includes the "Match History" tab)
             try:
-                match_sheet = sheet.spreadsheet.worksheet("Match History")
-            except Exception:
-                # worksheet might not exist or access failed
+                snapshot = await snapshot_cache.get()
+            except gspread.exceptions.WorksheetNotFound:
+                # worksheet might not exist
                 embed = discord.Embed(
                     title="❌ Match History Sheet Not Found",
                     description="Could not find a worksheet named `Match History` in the 1v1 Rankings spreadsheet.",
@@ -452,14 +704,7 @@ async def headtohead(ctx, player1=None, player2=None):
                 await ctx.send(embed=embed)
                 return
 
-            # Read columns (skip header row)
-            col_a = match_sheet.col_values(1)[1:]  # Player A
-            col_b = match_sheet.col_values(2)[1:]  # Score
-            col_c = match_sheet.col_values(3)[1:]  # Player B
-            col_d = match_sheet.col_values(4)[1:] if len(match_sheet.col_values(4)) > 1 else []
-
-            min_length = min(len(col_a), len(col_b), len(col_c))
-            if min_length == 0:
+            if len(snapshot.table("Match History")) <= 1:
                 embed = discord.Embed(
                     title="🤷 No Match Data",
                     description="No match history data found in the Match History sheet.",
@@ -468,30 +713,18 @@ async def headtohead(ctx, player1=None, player2=None):
                 await ctx.send(embed=embed)
                 return
 
-            # Collect matches where both players were involved (either side)
-            head_to_head_matches = []
-            for i in range(min_length):
-                row_p1 = str(col_a[i]).strip()
-                row_score = str(col_b[i]).strip()
-                row_p2 = str(col_c[i]).strip()
-                row_id = col_d[i].strip() if i < len(col_d) else ""
-
-                # Standardize for comparisons
-                row_p1_l = row_p1.lower()
-                row_p2_l = row_p2.lower()
-
-                # Check if this row involves both queried players
-                if ((row_p1_l == p1_query and row_p2_l == p2_query) or
-                    (row_p1_l == p2_query and row_p2_l == p1_query)):
-                    head_to_head_matches.append({
-                        "row": i + 2,  # +2 because we skipped header and lists are 0-indexed
-                        "player_a": row_p1,
-                        "score": row_score,
-                        "player_b": row_p2,
-                        "match_id": row_id
-                    })
-
-            if not head_to_head_matches:
+            # Pair index is built once per snapshot; lookup is O(matches between the pair)
+            players = directory(snapshot)
+            p1_id, p2_id = players.id_of(player1), players.id_of(player2)
+            if p1_id is None or p2_id is None:
+                pair = None
+            elif match_mirror:
+                await match_mirror.sync(snapshot)
+                pair = PairRecord.of(await match_mirror.head_to_head(p1_id, p2_id), players)
+            else:
+                pair = match_index(snapshot).lookup(p1_id, p2_id)
+
+            if not pair or not pair.matches:
                 embed = discord.Embed(
                     title="🤷 No Matches Found",
                     description=f"No head-to-head matches found between `{player1}` and `{player2}`.",
@@ -500,46 +733,10 @@ async def headtohead(ctx, player1=None, player2=None):
                 await ctx.send(embed=embed)
                 return
 
-            # Calculate W/L/D
-            player1_wins = 0
-            player2_wins = 0
-            draws = 0
-
-            for match in head_to_head_matches:
-                score = match["score"]
-                ma = match["player_a"]
-                mb = match["player_b"]
-
-                # Determine numeric scores if possible
-                if "-" in score:
-                    try:
-                        left, right = score.split("-", 1)
-                        left_score = int(left.strip())
-                        right_score = int(right.strip())
-
-                        # Map which side corresponds to the original player1 query
-                        if ma.lower() == p1_query:
-                            # player1 is on left side of score
-                            if left_score > right_score:
-                                player1_wins += 1
-                            elif right_score > left_score:
-                                player2_wins += 1
-                            else:
-                                draws += 1
-                        else:
-                            # player1 is on right side of score
-                            if right_score > left_score:
-                                player1_wins += 1
-                            elif left_score > right_score:
-                                player2_wins += 1
-                            else:
-                                draws += 1
-                    except Exception:
-                        # If parsing fails, skip win-counting for this match
-                        continue
-                else:
-                    # Non-standard score format: skip counting wins but still display match
-                    continue
+            # W/L/D were tallied when the index was built
+            player1_wins = pair.wins.get(p1_id, 0)
+            player2_wins = pair.wins.get(p2_id, 0)
+            draws = pair.draws
 
             # Prepare embed summary
             embed = discord.Embed(
@@ -550,13 +747,13 @@ async def headtohead(ctx, player1=None, player2=None):
             )
 
             # Show most recent 10 matches (from sheet order: oldest->newest, so take last 10)
-            recent = head_to_head_matches[-10:]
+            recent = pair.matches[-10:]
             recent.reverse()  # show newest first
 
             match_lines = ""
             for idx, m in enumerate(recent, 1):
-                mid = f" [{m['match_id']}]" if m.get("match_id") else ""
-                match_lines += f"**{idx}.** {m['player_a']} {m['score']} {m['player_b']}{mid}\n"
+                mid = f" [{m.match_id}]" if m.match_id else ""
+                match_lines += f"**{idx}.** {m.player_a} {m.score} {m.player_b}{mid}\n"
 
             if match_lines:
                 embed.add_field(name="📋 Recent Matches (newest first)", value=match_lines, inline=False)
@@ -588,7 +785,88 @@ async def headtohead(ctx, player1=None, player2=None):
         )
         await ctx.send(embed=embed)
 
+# === BACKGROUND SNAPSHOT REFRESH ===
+@tasks.loop(seconds=max(SHEETS_POLL_INTERVAL, 1))
+async def refresh_snapshot():
+    """Poll every tab cheaply and re-download only the ones that changed"""
+    request_priority.set(BACKGROUND)
+    try:
+        changed = await snapshot_cache.poll()
+        if changed:
+            print(f"🔄 Snapshot v{snapshot_cache.version}: refreshed {', '.join(changed)}")
+            if "Match History" in changed:
+                snapshot = await snapshot_cache.get()
+                await elo_engine.sync(snapshot)
+                if match_mirror:
+                    await match_mirror.sync(snapshot)
+    except Exception as e:
+        print(f"⚠️  Snapshot refresh failed: {e}")
+
+@tasks.loop(seconds=JOURNAL_FLUSH_INTERVAL)
+async def flush_journal():
+    """Push queued user writes to Sheets; failures back off and retry"""
+    request_priority.set(BACKGROUND)
+    flushed = await write_journal.flush(spreadsheet)
+    if flushed:
+        print(f"📒 Flushed {flushed} queued write(s) to Sheets")
+
+# Seconds shutdown waits for the last journal flush (Heroku allows 30 in all)
+JOURNAL_SHUTDOWN_TIMEOUT = 20
+
+async def flush_before_exit():
+    """One last flush on shutdown, ignoring any retry backoff"""
+    flush_journal.stop()  # lets a flush already in progress finish
+    if not spreadsheet or not write_journal.pending:
+        return
+    print(f"📒 Flushing {len(write_journal.pending)} queued write(s) before shutdown")
+
+    async def drain():
+        # A dead-lettered entry stops a pass early; keep going while it helps
+        while write_journal.pending:
+            queued = len(write_journal.pending)
+            await write_journal.flush(spreadsheet, force=True)
+            if len(write_journal.pending) == queued:
+                return
+
+    try:
+        await asyncio.wait_for(drain(), JOURNAL_SHUTDOWN_TIMEOUT)
+    except Exception as e:
+        print(f"⚠️  Final journal flush failed: {e}")
+    if write_journal.pending:
+        print(f"⚠️  {len(write_journal.pending)} write(s) left in {write_journal.path} for the next start")
+
+async def report_dead_letters(entries, error):
+    """Tell the admin channel, and whoever submitted them, about writes the journal gave up on"""
+    lines = []
+    for entry in entries:
+        if entry["op"] == "append":
+            what = f"{entry['tab']}: {' | '.join(str(v) for v in entry['values'])}"
+        else:
+            what = f"{entry['op']}: " + ", ".join(
+                f"{k}={v}" for k, v in entry.items() if k not in ("id", "op", "user")
+            )
+        who = f" (from <@{entry['user']}>)" if entry.get("user") else ""
+        lines.append(f"• {what}{who}")
+    text = (
+        f"❌ {len(entries)} submission(s) could not be saved to Google Sheets and will not be retried:\n"
+        + "\n".join(lines)
+        + f"\n**Error:** `{str(error)[:300]}`\n"
+        f"Kept in `{write_journal.dead_path}`. Please re-enter them once the cause is fixed."
+    )
+    try:
+        channel = bot.get_channel(ALLOWED_CHANNEL_ID) or await bot.fetch_channel(ALLOWED_CHANNEL_ID)
+        await channel.send(text[:2000])
+    except Exception as e:
+        print(f"⚠️  Could not report dead-lettered writes to the admin channel: {e}")
+
 # === BOT EVENTS ===
+# Admin review sessions queue behind interactive commands for Sheets quota
+ADMIN_COMMANDS = {"doadmin", "reviewreports", "reviewnames"}
+
+@bot.before_invoke
+async def set_sheets_priority(ctx):
+    request_priority.set(BULK if ctx.command.name in ADMIN_COMMANDS else INTERACTIVE)
+
 @bot.event
 async def on_ready():
     """Event triggered when bot successfully connects to Discord"""
@@ -602,11 +880,21 @@ async def on_ready():
     )
     await bot.change_presence(activity=activity)
 
-    # Test Google Sheets connection
+    # Test Google Sheets connection and resolve every tab handle once
     if sheet:
+        # Start the loops first: queued user writes must flush even if the
+        # warm-up below hits a transient Sheets error
+        if SHEETS_POLL_INTERVAL > 0 and not refresh_snapshot.is_running():
+            refresh_snapshot.start()
+        if not flush_journal.is_running():
+            flush_journal.start()
         try:
             sheet_title = sheet.spreadsheet.title
             print(f"📊 Google Sheets connected: {sheet_title}")
+            if "Match History" not in spreadsheet.registry:
+                await spreadsheet.registry.load()
+            await elo_engine.sync(await snapshot_cache.get())
+            print(f"📈 Elo replayed for {len(elo_engine)} player(s)")
         except Exception as e:
             print(f"⚠️  Google Sheets connection warning: {str(e)}")
     else:
@@ -3039,45 +3327,93 @@ async def mind_blown(ctx):
     # Send the response
     await ctx.send(f"🤯 {selected_question}")
     
+@bot.command(name="elohistory")
+async def elohistory(ctx, *, player_name=None):
+    """
+    Show a player's rating after each of their recent matches.
+    Usage: !elohistory <player_name>
+    """
+    if not player_name:
+        await ctx.send("❌ Usage: `!elohistory <player_name>`")
+        return
+
+    try:
+        snapshot = await snapshot_cache.get()
+        ratings = await elo_engine.sync(snapshot)
+        player_id = directory(snapshot).id_of(player_name)
+        series = ratings.history.get(player_id) if player_id is not None else None
+
+        if not series:
+            await ctx.send(f"❌ No rated matches found for player `{player_name}`.")
+            return
+
+        players = ratings.players
+        embed = discord.Embed(
+            title=f"📈 Elo history for {players.display_name(player_id)}",
+            description=(
+                f"**Current:** {series.ratings[-1]:.1f} | "
+                f"**Peak:** {max(series.ratings):.1f} | "
+                f"**Low:** {min(series.ratings):.1f} | "
+                f"**Games:** {len(series)}"
+            ),
+            color=0x00ff00
+        )
+
+        lines = []
+        for i in range(len(series) - 1, max(len(series) - 10, 0) - 1, -1):
+            match = ratings.log[series.matches[i]]
+            lines.append(
+                f"`{series.deltas[i]:+6.1f}` → **{series.ratings[i]:.1f}** "
+                f"— {match.player_a} {match.score} {match.player_b}"
+            )
+        embed.add_field(name="Recent matches (newest first)", value="\n".join(lines), inline=False)
+
+        await ctx.send(embed=embed)
+
+    except Exception as e:
+        await ctx.send("❌ Error fetching Elo history.")
+        print(f"Error in elohistory: {e}")
+
 @bot.command()
 async def gamesbyplayer(ctx, *, player_name: str):
     """
     Shows the last 20 games for a given player.
     Usage: !gamesbyplayer <player_name>
     """
-    import os
-    import json
-    import gspread
-    from oauth2client.service_account import ServiceAccountCredentials
     import traceback
-    import discord
 
-    try:
-        # Set up Google Sheets credentials from environment variable
-        scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-        creds_json = os.environ.get("GOOGLE_CREDS_JSON")
-        if not creds_json:
-            await ctx.send("❌ GOOGLE_CREDS_JSON environment variable not found.")
-            return
-
-        creds_dict = json.loads(creds_json)
-        creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
-        gc = gspread.authorize(creds)
-
-        # Open the spreadsheet and select the "Match History" sheet
-        sh = gc.open("1v1 Rankings")
-        sheet = sh.worksheet("Match History")
+    if not sheet:
+        await ctx.send("❌ Google Sheets connection unavailable.")
+        return
 
-        all_matches = sheet.get_all_values()[1:]  # skip header row
-        filtered_matches = []
+    try:
+        # Match History comes from the shared snapshot (same long-lived client)
+        snapshot = await snapshot_cache.get()
+        player_id = directory(snapshot).id_of(player_name)
+        ratings = await elo_engine.sync(snapshot)
+        own_games = []
+        if not match_mirror and player_id is not None:
+            own_games = match_index(snapshot).games_for(player_id)
+
+        if match_mirror:
+            # Indexed lookup: player ID first, name substring only as a fallback
+            await match_mirror.sync(snapshot)
+            games = await match_mirror.games_for(player_id, player_name, limit=20)
+            recent_matches = [(m[0], list(m[1:])) for m in games]  # already newest first
+        elif own_games:
+            # Any current or past name resolves to the same player ID
+            recent_matches = [(m[0], list(m[1:])) for m in own_games[-20:][::-1]]
+        else:
+            all_matches = snapshot.values("Match History")[1:]  # skip header row
+            filtered_matches = []
 
-        # Search both Player A (col 0) and Player B (col 2)
-        for row in all_matches:
-            if player_name.lower() in row[0].lower() or player_name.lower() in row[2].lower():
-                filtered_matches.append(row)
+            # Search both Player A (col 0) and Player B (col 2)
+            for row_number, row in enumerate(all_matches, start=2):
+                if player_name.lower() in row[0].lower() or player_name.lower() in row[2].lower():
+                    filtered_matches.append((row_number, row))
 
-        # Take the 20 most recent
-        recent_matches = filtered_matches[-20:][::-1]  # newest first
+            # Take the 20 most recent
+            recent_matches = filtered_matches[-20:][::-1]  # newest first
 
         if not recent_matches:
             await ctx.send(f"❌ No matches found for player `{player_name}`.")
@@ -3088,7 +3424,7 @@ async def gamesbyplayer(ctx, *, player_name: str):
             color=discord.Color.blue()
         )
 
-        for match in recent_matches:
+        for row_number, match in recent_matches:
             # Defensive unpacking in case some rows are shorter
             player_a = match[0] if len(match) > 0 else ""
             score    = match[1] if len(match) > 1 else ""
@@ -3096,9 +3432,13 @@ async def gamesbyplayer(ctx, *, player_name: str):
             match_id = match[3] if len(match) > 3 else "N/A"
             status   = match[4] if len(match) > 4 else ""
 
+            # Rating change each side took from this match
+            deltas = ratings.delta_for(Match(row_number, player_a, score, player_b, match_id, status))
+            swing = f" ({deltas[0]:+.0f} / {deltas[1]:+.0f})" if deltas else ""
+
             embed.add_field(
                 name=f"Match {match_id} [{status}]",
-                value=f"**{player_a}** {score} **{player_b}**",
+                value=f"**{player_a}** {score} **{player_b}**{swing}",
                 inline=False
             )
 
@@ -3122,11 +3462,17 @@ async def register(ctx):
         reply = await bot.wait_for("message", check=check, timeout=120.0)
         requested_name = reply.content.strip()
 
-        # Append to Google Sheet
+        # Queue the append to Google Sheet
         try:
-            pending_sheet = sheet.spreadsheet.worksheet("Pending Registrations")
             # Force Discord ID to string so Sheets stores it as text
-            pending_sheet.append_row([str(ctx.author.id), requested_name, "Pending"])
+            write_journal.submit(
+                "append",
+                tab="Pending Registrations",
+                values=[str(ctx.author.id), requested_name, "Pending"],
+                user=ctx.author.id,
+            )
+            registrations.record(ctx.author.id, requested_name, "Pending")
+            user_cache.put(ctx.author)
             await reply.channel.send("✅ Your registration has been saved and will be reviewed.")
         except Exception as e:
             await reply.channel.send("❌ Failed to save registration. Please try again later.")
@@ -3141,28 +3487,32 @@ async def register(ctx):
 @owner_or_channel()   # ⬅️ Anyone in allowed channel OR owner can run the command
 async def doadmin(ctx):
     try:
-        pending_sheet = sheet.spreadsheet.worksheet("Pending Registrations")
-        rows = pending_sheet.get_all_records()
+        pending_sheet = await spreadsheet.worksheet("Pending Registrations")
+        queue = await open_review("Pending Registrations")
 
-        if not rows:
+        if not queue:
             await ctx.send("📭 No pending registrations.")
             return
+        await ctx.send(f"📋 {len(queue)} pending registration(s).")
 
-        for i, reg in enumerate(rows, start=2):  # start=2 because row 1 is headers
-            discord_id = reg["Discord ID"]
-            requested_name = reg["Requested Name"]
-            status = reg["Status"]
+        # Resolve every pending user up front so the review loop never waits on Discord
+        users = await user_cache.get_many(
+            (reg.discord_id for reg in queue if reg.discord_id.isdigit()),
+            guild=ctx.guild,
+        )
 
-            if status != "Pending":
+        for reg in queue:
+            i = reg.row
+            requested_name = reg.name
+            if not reg.discord_id.isdigit():
                 continue
 
-            discord_id = int(discord_id)
-            user = ctx.guild.get_member(discord_id)
-            if not user:
-                user = await bot.fetch_user(discord_id)
+            discord_id = int(reg.discord_id)
+            user = users.get(discord_id)
+            mention = user.mention if user else f"<@{discord_id}>"
 
             await ctx.send(
-                f"{user.mention} is registering for **{requested_name}**.\n"
+                f"{mention} is registering for **{requested_name}**.\n"
                 f"Type `1` to accept or `2` to deny."
             )
 
@@ -3181,11 +3531,17 @@ async def doadmin(ctx):
                 reply = await bot.wait_for("message", check=check, timeout=60.0)
 
                 if reply.content == "1":
-                    pending_sheet.update_cell(i, 3, "Accepted")
-                    await ctx.send(f"✅ Accepted {user.mention} as '{requested_name}'")
+                    await pending_sheet.update_cell(i, 3, "Accepted")
+                    queue.decide(i)
+                    registrations.record(discord_id, requested_name, "Accepted")
+                    snapshot_cache.invalidate("Pending Registrations")
+                    await ctx.send(f"✅ Accepted {mention} as '{requested_name}'")
                 else:
-                    pending_sheet.update_cell(i, 3, "Denied")
-                    await ctx.send(f"❌ Denied registration for {user.mention}")
+                    await pending_sheet.update_cell(i, 3, "Denied")
+                    queue.decide(i)
+                    registrations.record(discord_id, requested_name, "Denied")
+                    snapshot_cache.invalidate("Pending Registrations")
+                    await ctx.send(f"❌ Denied registration for {mention}")
 
             except asyncio.TimeoutError:
                 await ctx.send("⏳ Timeout — moving to next request.")
@@ -3196,6 +3552,18 @@ async def doadmin(ctx):
         await ctx.send("❌ Error accessing Pending Registrations sheet.")
         print(f"Error in doadmin: {e}")
 
+def match_id_for(message):
+    """
+    Unique, time-ordered match ID taken from the report message's snowflake,
+    so no sheet read is needed to number a new match.
+    """
+    digits = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    n, out = message.id, ""
+    while n:
+        n, r = divmod(n, 36)
+        out = digits[r] + out
+    return f"M-{out}"
+
 @bot.command(name="report")
 async def report(ctx, player1=None, score=None, player2=None):
     """
@@ -3208,54 +3576,58 @@ async def report(ctx, player1=None, score=None, player2=None):
         return
 
     try:
-        match_sheet = sheet.spreadsheet.worksheet("Match History")
-        next_row = len(match_sheet.get_all_values()) + 1
-
-        # Write Player1 (A), Score (B), Player2 (C), mark Pending (E)
-        match_sheet.update(f"A{next_row}", player1)
-        match_sheet.update(f"B{next_row}", score)
-        match_sheet.update(f"C{next_row}", player2)
-        match_sheet.update(f"E{next_row}", "Pending")
-
-        # Mentions if registered
-        reg_sheet = sheet.spreadsheet.worksheet("Pending Registrations")
-        regs = reg_sheet.get_all_records()
-        mentions = []
-        for reg in regs:
-            if reg["Status"] == "Accepted":
-                if reg["Requested Name"].lower() == player1.lower():
-                    user = await bot.fetch_user(int(reg["Discord ID"]))
-                    mentions.append(user.mention)
-                if reg["Requested Name"].lower() == player2.lower():
-                    user = await bot.fetch_user(int(reg["Discord ID"]))
-                    mentions.append(user.mention)
-
-        mention_text = " ".join(mentions) if mentions else ""
-        await ctx.send(f"{mention_text}\n**{player1} {score} {player2}** reported by {ctx.author.mention}")
+        match_id = match_id_for(ctx.message)
+
+        # Queue Player1 (A), Score (B), Player2 (C), Match ID (D), Pending (E).
+        # The journal flushes it as one atomic append; Sheets picks the row
+        # server-side, so simultaneous reports never collide.
+        write_journal.submit(
+            "append",
+            tab="Match History",
+            values=[player1, score, player2, match_id, "Pending"],
+            user=ctx.author.id,
+        )
 
     except Exception as e:
         await ctx.send("❌ Error saving match report.")
         print(f"Error in !report: {e}")
+        return
+
+    # Mentions if registered. Best-effort: the report is already queued, so
+    # use whatever snapshot is in memory and never wait on Sheets or REST.
+    mentions = []
+    try:
+        registrations.sync(snapshot_cache.current)
+        for name in (player1, player2):
+            discord_id = registrations.discord_id(name)
+            if discord_id is not None:
+                user = user_cache.peek(discord_id) or bot.get_user(discord_id)
+                mentions.append(user.mention if user else f"<@{discord_id}>")
+    except Exception as e:
+        print(f"⚠️  Could not resolve report mentions: {e}")
+
+    mention_text = " ".join(mentions) if mentions else ""
+    await ctx.send(f"{mention_text}\n**{player1} {score} {player2}** reported by {ctx.author.mention} (`{match_id}`)")
 
 @bot.command(name="reviewreports")
 @owner_or_channel()  # Owner OR anyone in allowed channel
 async def reviewreports(ctx):
+    # Decisions are buffered and committed together when the session ends
+    edits = TabEdits("Match History")
     try:
-        match_sheet = sheet.spreadsheet.worksheet("Match History")
-        rows = match_sheet.get_all_records()
+        queue = await open_review("Match History")
+        await elo_engine.sync(await snapshot_cache.get())
 
-        if not rows:
+        if not queue:
             await ctx.send("📭 No match reports to review.")
             return
+        await ctx.send(f"📋 {len(queue)} pending match report(s).")
 
-        for i, reg in enumerate(rows, start=2):  # row 1 = headers
-            player1 = reg["Player 1"]
-            score = reg["Score"]
-            player2 = reg["Player 2"]
-            pending = reg.get("Pending", "")
-
-            if pending.lower() != "pending":
-                continue
+        for match in queue:
+            i = match.row
+            player1 = match.player_a
+            score = match.score
+            player2 = match.player_b
 
             await ctx.send(
                 f"📋 Reported match:\n"
@@ -3284,7 +3656,10 @@ async def reviewreports(ctx):
 
                 # ACCEPT
                 if reply.content == "1":
-                    match_sheet.update_cell(i, 5, "Yes")
+                    edits.set(i, "E", "Yes")
+                    queue.decide(i)
+                    elo_engine.accept(match)
+                    glicko_engine.accept(match)
                     await ctx.send(
                         f"✅ Accepted match:\n"
                         f"**{player1} {score} {player2}**"
@@ -3292,7 +3667,8 @@ async def reviewreports(ctx):
 
                 # DENY
                 elif reply.content == "2":
-                    match_sheet.delete_rows(i)
+                    edits.delete(i)
+                    queue.decide(i)
                     await ctx.send(
                         f"❌ Denied match (row deleted):\n"
                         f"**{player1} {score} {player2}**"
@@ -3334,10 +3710,10 @@ async def reviewreports(ctx):
                         new_player2 = " ".join(parts[2:])
 
                         # Update row but KEEP pending
-                        match_sheet.update_cell(i, 1, new_player1)
-                        match_sheet.update_cell(i, 2, new_score)
-                        match_sheet.update_cell(i, 3, new_player2)
-                        match_sheet.update_cell(i, 5, "Pending")
+                        edits.set(i, "A", new_player1)
+                        edits.set(i, "B", new_score)
+                        edits.set(i, "C", new_player2)
+                        edits.set(i, "E", "Pending")
 
                         await ctx.send(
                             f"💾 Edit saved (still pending):\n"
@@ -3361,6 +3737,19 @@ async def reviewreports(ctx):
         await ctx.send("❌ Error accessing Match History sheet.")
         print(f"Error in reviewreports: {e}")
 
+    finally:
+        # Commit every decision made this session in two requests at most
+        if edits:
+            try:
+                await edits.commit(spreadsheet)
+                await ctx.send("💾 All review decisions saved.")
+            except Exception as e:
+                await ctx.send("❌ Error saving review decisions. Please run `reviewreports` again.")
+                print(f"Error committing reviewreports: {e}")
+                elo_engine.reset()
+                glicko_engine.reset()
+            snapshot_cache.invalidate("Match History", "Sheet1")
+
 @bot.command(name='team')
 async def team(ctx, *, team_name=None):
     """
@@ -3388,9 +3777,9 @@ async def team(ctx, *, team_name=None):
     try:
         async with ctx.typing():
 
-            # === LOAD SKPL STANDINGS (ONE API CALL) ===
-            standings_sheet = sheet.spreadsheet.worksheet("SKPL Standings")
-            standings_data = standings_sheet.get_all_values()
+            # === LOAD SKPL STANDINGS (FROM SNAPSHOT) ===
+            snapshot = await snapshot_cache.get()
+            standings_data = snapshot.values("SKPL Standings")
 
             # Group A = rows 3–7 (index 2–6)
             # Group B = rows 12–16 (index 11–15)
@@ -3451,10 +3840,9 @@ async def team(ctx, *, team_name=None):
             embed.add_field(name="⭐ PTS/Game", value=pts_game, inline=True)
             embed.add_field(name="🏅 Points", value=pts, inline=True)
 
-            # === LOAD PLAYER STATS (ONE API CALL) ===
+            # === LOAD PLAYER STATS (FROM SNAPSHOT) ===
             try:
-                players_sheet = sheet.spreadsheet.worksheet("SKPL Stats")
-                players_data = players_sheet.get_all_values()
+                players_data = snapshot.values("SKPL Stats")
 
                 headers = players_data[2]   # row 3
                 rows = players_data[3:]     # row 4+
@@ -3532,7 +3920,7 @@ async def team(ctx, *, team_name=None):
 async def standings(ctx):
     """
     Show SKPL standings for Group A and Group B.
-    Optimized: Only ONE Google Sheets API call.
+    Served from the shared snapshot; no Sheets call when the cache is warm.
     """
     if not sheet:
         await ctx.send("❌ Google Sheets connection unavailable.")
@@ -3540,15 +3928,13 @@ async def standings(ctx):
 
     try:
         async with ctx.typing():
-            # Open SKPL Standings tab
-            try:
-                skpl_sheet = sheet.spreadsheet.worksheet("SKPL Standings")
-            except Exception:
+            # Load SKPL Standings from the snapshot
+            snapshot = await snapshot_cache.get()
+            if "SKPL Standings" not in spreadsheet.registry:
                 await ctx.send("❌ Could not find a worksheet named **SKPL Standings**.")
                 return
 
-            # ONE API CALL — get entire sheet
-            data = skpl_sheet.get_all_values()
+            data = snapshot.values("SKPL Standings")
 
             # Helper to parse rows from memory
             def parse_group(start_row, end_row):
@@ -3645,24 +4031,58 @@ async def standings(ctx):
         print(f"❌ Error in standings command: {e}")
         await ctx.send("❌ Error retrieving SKPL standings. Please try again later.")
 
+async def rename_player(old_name, new_name):
+    """
+    Rename a player. With a "Player Aliases" tab this is ONE alias row: the
+    player's ID keeps every old name, so no history is rewritten. Without it,
+    Sheet1 (Column A) and Match History (Columns A & C) are rewritten, with
+    the affected cells taken from the snapshot and sent in ONE batched update.
+    """
+    # Resolve through the registry (reloading it if a stale handle cleared it)
+    # so a forgotten layout never silently switches to rewriting history
+    try:
+        alias_sheet = await spreadsheet.worksheet("Player Aliases")
+    except gspread.exceptions.WorksheetNotFound:
+        alias_sheet = None
+
+    if alias_sheet is not None:
+        await alias_sheet.append_row([old_name, new_name], table_range="A1")
+        snapshot_cache.invalidate("Player Aliases")
+        return {"Player Aliases"}
+
+    # Re-read both tabs first: reports queued just before this rename may have
+    # been appended earlier in the same journal flush, after the cached copy
+    snapshot_cache.invalidate("Sheet1", "Match History")
+    snapshot = await snapshot_cache.get()
+    data = []
+
+    for i, row in enumerate(snapshot.values("Sheet1"), start=1):
+        if row and row[0] == old_name:
+            data.append({"range": absolute_range_name("Sheet1", f"A{i}"), "values": [[new_name]]})
+
+    for i, row in enumerate(snapshot.values("Match History"), start=1):
+        for col, letter in ((0, "A"), (2, "C")):
+            if len(row) > col and row[col] == old_name:
+                data.append({"range": absolute_range_name("Match History", f"{letter}{i}"), "values": [[new_name]]})
+
+    if data:
+        await spreadsheet.values_batch_update(data)
+    snapshot_cache.invalidate("Sheet1", "Match History")
+    return {"Sheet1", "Match History"}
+
+write_journal.handlers["rename"] = lambda entry: rename_player(entry["old"], entry["new"])
+
 @bot.command(name="changename")
 async def changename(ctx):
     try:
-        reg_sheet = sheet.spreadsheet.worksheet("Pending Registrations")
-        name_sheet = sheet.spreadsheet.worksheet("Pending Name Changes")
+        snapshot = await snapshot_cache.get()
 
         user_id = str(ctx.author.id)
-        reg_rows = reg_sheet.get_all_records()
-
-        is_registered = False
-        registered_name = None
 
         # Check registration
-        for r in reg_rows:
-            if str(r["Discord ID"]) == user_id and r["Status"].lower() == "accepted":
-                is_registered = True
-                registered_name = r["Requested Name"]
-                break
+        registrations.sync(snapshot)
+        registered_name = registrations.registered_name(ctx.author.id)
+        is_registered = registered_name is not None
 
         # Ask for NEW name
         await ctx.author.send("✏️ What name do you want to change **to**?")
@@ -3679,24 +4099,13 @@ async def changename(ctx):
         if is_registered:
             old_name = registered_name
 
-            sheet1 = sheet.spreadsheet.worksheet("Sheet1")
-            mh = sheet.spreadsheet.worksheet("Match History")
-
-            # Update Sheet1 (Column A)
-            for i, val in enumerate(sheet1.col_values(1), start=1):
-                if val == old_name:
-                    sheet1.update_cell(i, 1, new_name)
-
-            # Update Match History (Column A & C)
-            for i, row in enumerate(mh.get_all_values(), start=1):
-                if row[0] == old_name:
-                    mh.update_cell(i, 1, new_name)
-                if row[2] == old_name:
-                    mh.update_cell(i, 3, new_name)
+            # Rename is applied to Sheet1 and Match History by the journal flush
+            write_journal.submit("rename", old=old_name, new=new_name, user=ctx.author.id)
 
             await ctx.author.send(
                 f"✅ Name changed successfully:\n"
-                f"**{old_name} → {new_name}**"
+                f"**{old_name} → {new_name}**\n"
+                f"It will show in the rankings within a few seconds."
             )
             return
 
@@ -3711,12 +4120,12 @@ async def changename(ctx):
         )
         old_name = old_reply.content.strip()
 
-        name_sheet.append_row([
-            user_id,
-            old_name,
-            new_name,
-            "Pending"
-        ])
+        write_journal.submit(
+            "append",
+            tab="Pending Name Changes",
+            values=[user_id, old_name, new_name, "Pending"],
+            user=ctx.author.id,
+        )
 
         await ctx.author.send(
             "📨 Name change request submitted.\n"
@@ -3731,22 +4140,19 @@ async def changename(ctx):
 @bot.command(name="reviewnames")
 @owner_or_channel()
 async def reviewnames(ctx):
+    # Status edits and denials are committed together (deletions bottom-up)
+    edits = TabEdits("Pending Name Changes")
     try:
-        name_sheet = sheet.spreadsheet.worksheet("Pending Name Changes")
-        sheet1 = sheet.spreadsheet.worksheet("Sheet1")
-        mh = sheet.spreadsheet.worksheet("Match History")
-
-        rows = name_sheet.get_all_records()
-        if not rows:
+        queue = await open_review("Pending Name Changes")
+        if not queue:
             await ctx.send("📭 No pending name changes.")
             return
+        await ctx.send(f"📋 {len(queue)} pending name change(s).")
 
-        for i, r in enumerate(rows, start=2):
-            if r["Status"].lower() != "pending":
-                continue
-
-            old_name = r["Old Name"]
-            new_name = r["Requested New Name"]
+        for change in queue:
+            i = change.row
+            old_name = change.old_name
+            new_name = change.new_name
 
             await ctx.send(
                 f"📋 Name change request:\n"
@@ -3771,24 +4177,17 @@ async def reviewnames(ctx):
 
                 # ACCEPT
                 if reply.content == "1":
-                    # Sheet1
-                    for x, val in enumerate(sheet1.col_values(1), start=1):
-                        if val == old_name:
-                            sheet1.update_cell(x, 1, new_name)
-
-                    # Match History
-                    for y, row in enumerate(mh.get_all_values(), start=1):
-                        if row[0] == old_name:
-                            mh.update_cell(y, 1, new_name)
-                        if row[2] == old_name:
-                            mh.update_cell(y, 3, new_name)
-
-                    name_sheet.update_cell(i, 4, "Accepted")
+                    # Sheet1 + Match History
+                    await rename_player(old_name, new_name)
+
+                    edits.set(i, "D", "Accepted")
+                    queue.decide(i)
                     await ctx.send(f"✅ Accepted: **{old_name} → {new_name}**")
 
                 # DENY
                 elif reply.content == "2":
-                    name_sheet.delete_rows(i)
+                    edits.delete(i)
+                    queue.decide(i)
                     await ctx.send(f"❌ Denied request for **{old_name}**")
 
                 # EDIT
@@ -3802,9 +4201,9 @@ async def reviewnames(ctx):
                         await ctx.send("❌ Invalid format. Skipped.")
                         continue
 
-                    name_sheet.update_cell(i, 2, parts[0])
-                    name_sheet.update_cell(i, 3, parts[1])
-                    name_sheet.update_cell(i, 4, "Pending")
+                    edits.set(i, "B", parts[0])
+                    edits.set(i, "C", parts[1])
+                    edits.set(i, "D", "Pending")
 
                     await ctx.send("💾 Edit saved (still pending).")
 
@@ -3817,6 +4216,151 @@ async def reviewnames(ctx):
         await ctx.send("❌ Error reviewing name changes.")
         print(f"Error in reviewnames: {e}")
 
+    finally:
+        if edits:
+            try:
+                await edits.commit(spreadsheet)
+            except Exception as e:
+                await ctx.send("❌ Error saving name change decisions. Please run `reviewnames` again.")
+                print(f"Error committing reviewnames: {e}")
+            snapshot_cache.invalidate("Pending Name Changes")
+
+@bot.command(name="pending")
+@owner_or_channel()
+async def pending(ctx):
+    """Count items awaiting review, straight from the review queues"""
+    try:
+        snapshot = await snapshot_cache.get()
+        labels = {
+            "Match History": ("Match reports", "reviewreports"),
+            "Pending Registrations": ("Registrations", "doadmin"),
+            "Pending Name Changes": ("Name changes", "reviewnames"),
+        }
+
+        embed = discord.Embed(title="📋 Pending Reviews", color=0x00ff00)
+        for title, (label, command) in labels.items():
+            count = len(review_queues[title].sync(snapshot))
+            queued = write_journal.queued(title)
+            value = f"**{count}** pending"
+            if queued:
+                value += f" (+{queued} queued)"
+            embed.add_field(name=f"{label} — `{command}`", value=value, inline=False)
+
+        await ctx.send(embed=embed)
+
+    except Exception as e:
+        await ctx.send("❌ Error counting pending reviews.")
+        print(f"Error in pending: {e}")
+
+@bot.command(name="laddermode")
+@owner_or_channel()
+async def laddermode(ctx, mode=None):
+    """
+    Choose which ratings playerelo, top10, rank and leaderboard show.
+    Usage: !laddermode elo|glicko
+    """
+    global ladder_mode
+
+    if mode is None:
+        await ctx.send(f"📊 Ladder mode is **{ladder_mode}**. Usage: `!laddermode elo|glicko`")
+        return
+
+    mode = mode.lower()
+    if mode not in ("elo", "glicko"):
+        await ctx.send("❌ Usage: `!laddermode elo|glicko`")
+        return
+
+    try:
+        # Build the ladder before switching so a failure leaves the old mode in place
+        engine = glicko_engine if mode == "glicko" else elo_engine
+        await engine.sync(await snapshot_cache.get())
+        ladder_mode = mode
+        await ctx.send(f"✅ Ladder mode set to **{mode}** ({len(engine)} rated players).")
+    except Exception as e:
+        await ctx.send("❌ Error switching ladder mode.")
+        print(f"Error in laddermode: {e}")
+
+# Most parameter sets one !elosweep may compare
+MAX_SWEEP_PARAMS = 64
+
+@bot.command(name="elosweep")
+@owner_or_channel()
+async def elosweep(ctx, *args):
+    """
+    Recompute every rating from Match History under several Elo settings.
+    Usage: !elosweep [K ...] [start=1000,1500]
+    Example: !elosweep 16 24 32 48 start=1000,1200
+    """
+    try:
+        ks, starts = [], []
+        for arg in args:
+            if arg.lower().startswith("start="):
+                starts += [float(v) for v in arg[6:].split(",") if v]
+            else:
+                ks += [float(v) for v in arg.split(",") if v]
+        ks = ks or [16, 24, 32, 48]
+        starts = starts or [ELO_START]
+    except ValueError:
+        await ctx.send("❌ Usage: `!elosweep [K ...] [start=1000,1500]`")
+        return
+
+    if len(ks) * len(starts) > MAX_SWEEP_PARAMS:
+        await ctx.send(f"❌ At most {MAX_SWEEP_PARAMS} K/start combinations per sweep.")
+        return
+
+    try:
+        async with ctx.typing():
+            snapshot = await snapshot_cache.get()
+            players = directory(snapshot)
+            matches = snapshot.table("Match History").matches()
+
+            # CPU-bound; keep the event loop free while NumPy works
+            loop = asyncio.get_running_loop()
+            report = await loop.run_in_executor(None, sweep_report, matches, players, ks, starts)
+
+            embed = discord.Embed(
+                title="🧮 Elo Recompute",
+                description=f"{report['matches']} rated matches, {len(report['players'])} players. "
+                            f"Lower Brier is better.",
+                color=0x00ff00
+            )
+            ranked = sorted(range(len(report["params"])), key=lambda i: report["brier"][i])
+            for i in ranked[:25]:
+                k, start = report["params"][i]
+                ratings = report["ratings"][i]
+                best = max(range(len(ratings)), key=ratings.__getitem__) if ratings else None
+                leader = (
+                    f"{players.display_name(report['players'][best])} ({ratings[best]:.1f})"
+                    if best is not None else "—"
+                )
+                embed.add_field(
+                    name=f"K={k:g}, start={start:g}",
+                    value=(
+                        f"Brier: {report['brier'][i]:.4f}\n"
+                        f"Accuracy: {report['accuracy'][i] * 100:.1f}%\n"
+                        f"#1: {leader}"
+                    ),
+                    inline=True
+                )
+
+            # Every player's rating under every setting, for offline comparison
+            out = io.StringIO()
+            writer = csv.writer(out)
+            writer.writerow(["Player"] + [f"K={k:g} start={start:g}" for k, start in report["params"]])
+            first = report["ratings"][ranked[0]] if ranked else []
+            for j in sorted(range(len(report["players"])), key=lambda j: -first[j]):
+                writer.writerow(
+                    [players.display_name(report["players"][j])]
+                    + [f"{ratings[j]:.1f}" for ratings in report["ratings"]]
+                )
+            file = discord.File(io.BytesIO(out.getvalue().encode()), filename="elo_sweep.csv")
+
+            await ctx.send(embed=embed, file=file)
+
+    except Exception as e:
+        await ctx.send("❌ Error recomputing ratings.")
+        print(f"Error in elosweep: {e}")
+
 # ============================
 # TRANSLATE COMMAND (2‑STEP)
 # ============================
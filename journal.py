@@ -0,0 +1,208 @@
+"""
+Durable write-behind journal for user submissions.
+
+Commands append an entry to a local JSON-lines file and answer the user
+right away; a background flush later applies queued entries to Sheets in
+batches (one append request per tab per flush), retrying with backoff.
+Entries still unacknowledged at startup are replayed, so a Sheets outage
+or a restart never loses a submission. Delivery is at-least-once.
+
+An entry that can never succeed (a 4xx from Sheets, an op nobody handles)
+or that keeps failing is moved to a dead-letter file so it can't hold up
+the submissions queued behind it, and reported through `on_dead_letter`.
+
+The journal is only as durable as the disk it lives on: WRITE_JOURNAL_PATH
+(and WRITE_JOURNAL_DEAD_PATH) must point at storage that survives a
+restart or redeploy, not an ephemeral container filesystem.
+"""
+import asyncio
+import json
+import os
+import time
+import uuid
+
+from gspread.exceptions import APIError
+
+# Must be on persistent storage; the default (working directory) is only
+# safe where that directory survives restarts
+WRITE_JOURNAL_PATH = os.getenv("WRITE_JOURNAL_PATH", "write_journal.jsonl")
+
+# Seconds between flushes; writes arriving in the same window share a request
+JOURNAL_FLUSH_INTERVAL = float(os.getenv("JOURNAL_FLUSH_INTERVAL", "5"))
+
+MAX_BACKOFF = 300
+
+# Entries that fail for good end up here, one JSON object per line
+WRITE_JOURNAL_DEAD_PATH = os.getenv("WRITE_JOURNAL_DEAD_PATH", "write_journal.dead.jsonl")
+
+# Failed attempts before a retryable entry is dead-lettered anyway
+JOURNAL_MAX_ATTEMPTS = int(os.getenv("JOURNAL_MAX_ATTEMPTS", "10"))
+
+
+class UnknownOp(Exception):
+    """Journal entry whose op has no registered handler"""
+
+
+def is_retryable(error):
+    """Quota, server and network errors may pass; bad requests never will"""
+    if isinstance(error, UnknownOp):
+        return False
+    if isinstance(error, APIError):
+        status = error.response.status_code
+        return status in (408, 429) or status >= 500
+    return True
+
+
+class WriteJournal:
+    """
+    Append-only queue of pending Sheets writes.
+
+    Entries are dicts with an "op" key. "append" entries ({"tab", "values"})
+    are applied natively; any other op is dispatched to a handler registered
+    in `handlers` as `async def handler(entry)`.
+    """
+
+    def __init__(self, path=WRITE_JOURNAL_PATH, dead_path=WRITE_JOURNAL_DEAD_PATH):
+        self.path = path
+        self.dead_path = dead_path
+        self.pending = []
+        self.handlers = {}
+        self.on_flushed = None  # callback(set of tab titles written)
+        self.on_dead_letter = None  # callback(entries, error) for writes given up on
+        self._backoff = 0
+        self._retry_at = 0.0
+        self._attempts = {}  # entry id -> failed attempts this run
+        self._lock = asyncio.Lock()
+        self._replay()
+
+    def _replay(self):
+        if not os.path.exists(self.path):
+            return
+        entries, done = {}, set()
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # torn final line from a crash mid-write
+                if "done" in record:
+                    done.add(record["done"])
+                else:
+                    entries[record["id"]] = record
+        self.pending = [e for i, e in entries.items() if i not in done]
+        if self.pending:
+            print(f"📒 Replaying {len(self.pending)} unflushed write(s) from {self.path}")
+
+    def _write(self, record, path=None):
+        with open(path or self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def submit(self, op, **fields):
+        """Durably queue a write; returns once it is safe to acknowledge the user"""
+        entry = {"id": uuid.uuid4().hex, "op": op, **fields}
+        self._write(entry)
+        self.pending.append(entry)
+        return entry["id"]
+
+    def queued(self, tab):
+        """Appends to `tab` accepted locally but not yet in Sheets"""
+        return sum(1 for e in self.pending if e["op"] == "append" and e["tab"] == tab)
+
+    def _ack(self, entries):
+        for entry in entries:
+            self._write({"done": entry["id"]})
+        done = {entry["id"] for entry in entries}
+        for entry_id in done:
+            self._attempts.pop(entry_id, None)
+        self.pending = [e for e in self.pending if e["id"] not in done]
+        if not self.pending:
+            # Everything is in Sheets: start the file over
+            open(self.path, "w").close()
+
+    def _dead_letter(self, entries, error):
+        """Park entries that will not succeed and drop them from the queue"""
+        for entry in entries:
+            self._write({**entry, "error": str(error) or type(error).__name__}, self.dead_path)
+        self._ack(entries)
+        print(f"❌ Journal gave up on {len(entries)} write(s), saved to {self.dead_path}: {error}")
+        if self.on_dead_letter:
+            self.on_dead_letter(entries, error)
+
+    async def _apply_appends(self, spreadsheet, entries):
+        by_tab = {}
+        for entry in entries:
+            by_tab.setdefault(entry["tab"], []).append(entry)
+        for tab, tab_entries in by_tab.items():
+            try:
+                worksheet = await spreadsheet.worksheet(tab)
+                await worksheet.append_rows(
+                    [entry["values"] for entry in tab_entries],
+                    insert_data_option="INSERT_ROWS",
+                    table_range="A1",
+                )
+            except Exception as e:
+                e.journal_entries = tab_entries
+                raise
+            # Ack per tab so a later tab failing never re-sends this one
+            self._ack(tab_entries)
+        return set(by_tab)
+
+    async def flush(self, spreadsheet, force=False):
+        """
+        Apply queued entries in order; appends between other ops are batched.
+        `force` skips the retry backoff (last flush before shutdown).
+        """
+        if not self.pending or (not force and time.monotonic() < self._retry_at):
+            return 0
+        # The background loop and review sessions both flush; never send twice
+        async with self._lock:
+            return await self._flush(spreadsheet)
+
+    async def _flush(self, spreadsheet):
+        batch = list(self.pending)
+        applied, touched = 0, set()
+        try:
+            while applied < len(batch):
+                # Run of consecutive appends -> one request per tab
+                run = []
+                while applied + len(run) < len(batch) and batch[applied + len(run)]["op"] == "append":
+                    run.append(batch[applied + len(run)])
+                if run:
+                    touched |= await self._apply_appends(spreadsheet, run)
+                    applied += len(run)
+                    continue
+
+                entry = batch[applied]
+                try:
+                    handler = self.handlers.get(entry["op"])
+                    if handler is None:
+                        raise UnknownOp(entry["op"])
+                    touched |= await handler(entry) or set()
+                except Exception as e:
+                    e.journal_entries = [entry]
+                    raise
+                self._ack([entry])
+                applied += 1
+
+            self._backoff = 0
+        except Exception as e:
+            failed = getattr(e, "journal_entries", [])
+            for entry in failed:
+                self._attempts[entry["id"]] = self._attempts.get(entry["id"], 0) + 1
+            if failed and (
+                not is_retryable(e)
+                or max(self._attempts[entry["id"]] for entry in failed) >= JOURNAL_MAX_ATTEMPTS
+            ):
+                self._dead_letter(failed, e)
+                # The entries behind it were never tried; go again on the next tick
+                self._backoff, self._retry_at = 0, 0.0
+            else:
+                self._backoff = min(max(self._backoff * 2, 5), MAX_BACKOFF)
+                self._retry_at = time.monotonic() + self._backoff
+                print(f"⚠️  Journal flush failed ({len(self.pending)} queued), retrying in {self._backoff}s: {e}")
+        finally:
+            if touched and self.on_flushed:
+                self.on_flushed(touched)
+        return applied
@@ -0,0 +1,424 @@
+"""
+In-memory league indexes built from a sheets.Snapshot.
+
+Each index is built once per snapshot version (see Snapshot.derive) so
+commands answer from pre-parsed data instead of rescanning sheet rows.
+"""
+from itertools import chain
+from operator import itemgetter
+
+
+def to_float(value, default=0.0):
+    try:
+        return float(value) if value != "" else default
+    except (ValueError, TypeError):
+        return default
+
+
+# === PLAYER DIRECTORY ===
+class PlayerDirectory:
+    """
+    Stable integer ID per player, reachable from every name they have used.
+    Names are normalized once per distinct spelling; after that every index
+    and join works on plain ints.
+    """
+
+    def __init__(self):
+        self.names = []   # id -> current display name
+        self._ids = {}    # normalized alias -> id
+        self._raw = {}    # exact cell text -> id (skips re-normalizing)
+
+    def __len__(self):
+        return len(self.names)
+
+    @staticmethod
+    def normalize(name):
+        return str(name).strip().lower()
+
+    def id_of(self, name):
+        """ID for a name as typed by a user or stored in a cell, or None"""
+        pid = self._raw.get(name)
+        if pid is None:
+            pid = self._ids.get(self.normalize(name))
+            if pid is not None:
+                self._raw[name] = pid
+        return pid
+
+    def add(self, name):
+        """ID for a name, registering it as a new player if unseen"""
+        pid = self.id_of(name)
+        if pid is None:
+            key = self.normalize(name)
+            if not key:
+                return None
+            pid = len(self.names)
+            self.names.append(str(name).strip())
+            self._ids[key] = pid
+            self._raw[name] = pid
+        return pid
+
+    def rename(self, old_name, new_name):
+        """Alias insert: the new name joins the old name's ID and becomes its display name"""
+        pid = self.add(old_name)
+        key = self.normalize(new_name)
+        if self._ids.get(key) != pid:
+            self._ids[key] = pid
+            self._raw = {}  # cached spellings of the new name may point elsewhere
+        self.names[pid] = str(new_name).strip()
+        return pid
+
+    def display_name(self, pid):
+        return self.names[pid]
+
+
+# One directory for the life of the process, so a player's ID never changes
+# between snapshots and long-lived state (ratings) can be keyed by it
+PLAYERS = PlayerDirectory()
+
+# Source tables already folded into PLAYERS. Names are only ever added, so a
+# tab that wasn't re-downloaded has nothing new to contribute.
+_folded = {}
+
+
+def directory(snapshot):
+    """Shared directory, updated from aliases first, then Sheet1 and Match History names"""
+    def build(snap):
+        players = PLAYERS
+        tables = {title: snap.table(title) for title in ("Player Aliases", "Sheet1", "Match History")}
+        fresh = {title for title, table in tables.items() if _folded.get(title) is not table}
+        if "Player Aliases" in fresh:
+            for row in tables["Player Aliases"].rows[1:]:
+                if len(row) >= 2 and row[0].strip() and row[1].strip():
+                    players.rename(row[0], row[1])
+        if "Sheet1" in fresh:
+            for row in tables["Sheet1"].rows[1:]:
+                if row:
+                    players.add(row[0])
+        if "Match History" in fresh:
+            # Each distinct name once, in order of first appearance
+            names = chain.from_iterable(map(itemgetter(1, 3), tables["Match History"].matches()))
+            for name in dict.fromkeys(names):
+                players.add(name)
+        _folded.update(tables)
+        return players
+    return snapshot.derive("directory", build)
+
+
+def player_records(snapshot):
+    """Sheet1 rows (get_all_records shape) keyed by player ID"""
+    def build(snap):
+        players = directory(snap)
+        records = {}
+        for record in snap.records("Sheet1"):
+            pid = players.id_of(str(record.get("Player", "")))
+            if pid is not None:
+                records.setdefault(pid, record)
+        return records
+    return snapshot.derive("player_records", build)
+
+
+# === LEADERBOARD (Sheet1) ===
+class Leaderboard:
+    """
+    Sheet1 stored column by column, parsed and ranked once per snapshot.
+    Columns are located by header name; the positions are only a fallback
+    for sheets whose header cells were renamed.
+    """
+
+    # field -> (header text, fallback 0-based column)
+    COLUMNS = {
+        "name": ("Player", 0),
+        "elo": ("Current Elo", 2),
+        "games": ("Games", 3),
+        "record": ("Record", 4),
+        "win_pct": ("Win %", 5),
+        "kd": ("K/D Ratio", 8),
+        "clean_sheets": ("Clean Sheets", 9),
+        "streak": ("Streak", 10),
+    }
+
+    def __init__(self, rows, players):
+        header = [h.strip().lower() for h in rows[0]] if rows else []
+        body = [row for row in rows[1:] if row and row[0].strip()]
+
+        self.columns = {}
+        for field, (title, fallback) in self.COLUMNS.items():
+            col = header.index(title.lower()) if title.lower() in header else fallback
+            self.columns[field] = [row[col].strip() if col < len(row) else "" for row in body]
+
+        # Elo is parsed here, never per request
+        self.elo = [to_float(v) for v in self.columns["elo"]]
+
+        # Rank once; top-k is then a slice
+        self.order = sorted(range(len(body)), key=lambda i: self.elo[i], reverse=True)
+        self.players = players
+        self.ids = [players.add(name) for name in self.columns["name"]]
+        self._by_id = {}
+        for i, pid in enumerate(self.ids):
+            self._by_id.setdefault(pid, i)
+
+    def __len__(self):
+        return len(self.order)
+
+    def row(self, i):
+        entry = {field: values[i] for field, values in self.columns.items()}
+        entry["id"] = self.ids[i]
+        entry["name"] = self.players.display_name(self.ids[i])
+        entry["elo"] = self.elo[i]
+        return entry
+
+    def top(self, k):
+        return [self.row(i) for i in self.order[:k]]
+
+    def find(self, pid):
+        i = self._by_id.get(pid)
+        return None if i is None else self.row(i)
+
+
+def leaderboard(snapshot):
+    return snapshot.derive(
+        "leaderboard",
+        lambda snap: Leaderboard(snap.values("Sheet1"), directory(snap))
+    )
+
+
+# === PLAYER STATS (from match scores) ===
+class StatLine:
+    """One player's running totals; each match updates it in O(1)"""
+
+    __slots__ = ("games", "wins", "losses", "draws", "kills", "deaths",
+                 "clean_sheets", "streak_kind", "streak")
+
+    def __init__(self):
+        self.games = self.wins = self.losses = self.draws = 0
+        self.kills = self.deaths = self.clean_sheets = 0
+        self.streak_kind, self.streak = "", 0
+
+    def add(self, scored, conceded):
+        self.games += 1
+        self.kills += scored
+        self.deaths += conceded
+        if conceded == 0:
+            self.clean_sheets += 1
+        kind = "W" if scored > conceded else "L" if scored < conceded else "D"
+        if kind == "W":
+            self.wins += 1
+        elif kind == "L":
+            self.losses += 1
+        else:
+            self.draws += 1
+        self.streak = self.streak + 1 if kind == self.streak_kind else 1
+        self.streak_kind = kind
+
+    def fields(self):
+        """Same keys and text shapes as the Sheet1 leaderboard row"""
+        record = f"{self.wins}-{self.losses}" + (f"-{self.draws}" if self.draws else "")
+        kd = self.kills / self.deaths if self.deaths else float(self.kills)
+        return {
+            "games": str(self.games),
+            "record": record,
+            "win_pct": f"{100.0 * self.wins / self.games:.1f}%" if self.games else "0.0%",
+            "kd": f"{kd:.2f}",
+            "clean_sheets": str(self.clean_sheets),
+            "streak": f"{self.streak_kind}{self.streak}" if self.streak else "—",
+        }
+
+
+class StatsBook:
+    """StatLine per player ID, fed one parsed match at a time"""
+
+    def __init__(self):
+        self.lines = {}
+
+    def __contains__(self, pid):
+        return pid in self.lines
+
+    def get(self, pid):
+        line = self.lines.get(pid)
+        return line.fields() if line else None
+
+    def add(self, id_a, id_b, left, right):
+        for pid, scored, conceded in ((id_a, left, right), (id_b, right, left)):
+            line = self.lines.get(pid)
+            if line is None:
+                line = self.lines[pid] = StatLine()
+            line.add(scored, conceded)
+
+
+# === HEAD-TO-HEAD (Match History) ===
+def parse_score(score):
+    """'2-1' -> (2, 1); None when the score is not in X-Y form"""
+    if "-" not in score:
+        return None
+    left, right = score.split("-", 1)
+    try:
+        return int(left.strip()), int(right.strip())
+    except ValueError:
+        return None
+
+
+def pair_key(id_a, id_b):
+    """Order-independent key for two player IDs"""
+    return (id_a, id_b) if id_a <= id_b else (id_b, id_a)
+
+
+class PairRecord:
+    """Every match between two players plus their W/L/D tally"""
+
+    __slots__ = ("matches", "wins", "draws")
+
+    def __init__(self):
+        self.matches = []  # sheet order: oldest -> newest
+        self.wins = {}     # player id -> wins
+        self.draws = 0
+
+    @classmethod
+    def of(cls, matches, players):
+        record = cls()
+        for match in matches:
+            record.add(match, players.id_of(match.player_a), players.id_of(match.player_b))
+        return record
+
+    def add(self, match, id_a, id_b):
+        self.matches.append(match)
+        parsed = parse_score(match.score)
+        if not parsed:
+            return  # non-standard score: still listed, not counted
+        left, right = parsed
+        if left == right:
+            self.draws += 1
+        else:
+            winner = id_a if left > right else id_b
+            self.wins[winner] = self.wins.get(winner, 0) + 1
+
+
+class MatchIndex:
+    """Match History grouped by player ID and by unordered player-ID pair"""
+
+    def __init__(self, matches, players):
+        self.players = players
+        self._pairs = {}
+        self._by_player = {}
+        for match in matches:
+            id_a, id_b = players.id_of(match.player_a), players.id_of(match.player_b)
+            if id_a is None or id_b is None:
+                continue
+            self._pairs.setdefault(pair_key(id_a, id_b), PairRecord()).add(match, id_a, id_b)
+            self._by_player.setdefault(id_a, []).append(match)
+            if id_b != id_a:
+                self._by_player.setdefault(id_b, []).append(match)
+
+    def lookup(self, id_a, id_b):
+        return self._pairs.get(pair_key(id_a, id_b))
+
+    def games_for(self, pid):
+        """Player's matches, oldest -> newest"""
+        return self._by_player.get(pid, [])
+
+
+def match_index(snapshot):
+    return snapshot.derive(
+        "match_index",
+        lambda snap: MatchIndex(snap.table("Match History").matches(), directory(snap))
+    )
+
+
+# === REGISTRATIONS (Pending Registrations) ===
+class RegistrationIndex:
+    """
+    Registration status by Discord ID, plus accepted player name -> Discord ID.
+
+    Rebuilt whenever the snapshot version changes. Decisions made in this
+    process (register, doadmin) are applied at once as local overrides and
+    dropped as soon as a snapshot contains the same row, so lookups never
+    wait for the write to reach Sheets.
+    """
+
+    def __init__(self):
+        self.version = None
+        self._rows = []       # Registration-like (discord_id, name, status) in sheet order
+        self._local = []      # decisions not yet seen in a snapshot
+        self._by_name = {}    # normalized name -> discord id (accepted only)
+        self._by_user = {}    # discord id -> accepted name
+
+    def sync(self, snapshot):
+        if self.version == snapshot.version:
+            return
+        rows = []
+        for reg in snapshot.table("Pending Registrations").registrations():
+            try:
+                rows.append((int(reg.discord_id), reg.name, reg.status.lower()))
+            except ValueError:
+                continue
+        seen = set(rows)
+        self._local = [d for d in self._local if d not in seen]
+        self._rows = rows
+        self.version = snapshot.version
+        self._rebuild()
+
+    def record(self, discord_id, name, status):
+        """Apply a decision made here before it is visible in the sheet"""
+        self._local.append((int(discord_id), str(name).strip(), status.lower()))
+        self._rebuild()
+
+    def _rebuild(self):
+        by_name, by_user = {}, {}
+        for discord_id, name, status in self._rows + self._local:
+            key = PlayerDirectory.normalize(name)
+            if status == "accepted":
+                by_name[key] = discord_id
+                by_user[discord_id] = name
+            elif status == "denied" and by_name.get(key) == discord_id:
+                del by_name[key]
+                by_user.pop(discord_id, None)
+        self._by_name, self._by_user = by_name, by_user
+
+    def discord_id(self, name):
+        """Discord ID registered for a player name, or None"""
+        return self._by_name.get(PlayerDirectory.normalize(name))
+
+    def registered_name(self, discord_id):
+        """Accepted player name for a Discord user, or None"""
+        return self._by_user.get(int(discord_id))
+
+
+# === REVIEW QUEUES ===
+PENDING_ITEMS = {
+    "Match History": lambda table: table.matches(),
+    "Pending Registrations": lambda table: table.registrations(),
+    "Pending Name Changes": lambda table: table.name_changes(),
+}
+
+
+class ReviewQueue:
+    """
+    Rows of one tab still awaiting an admin decision, in sheet order.
+
+    Rebuilt only when that tab itself is re-downloaded, so opening a review
+    session walks the pending rows, not the whole history. Rows decided in
+    this process leave the queue at once.
+    """
+
+    def __init__(self, title):
+        self.title = title
+        self._table = None
+        self._items = []
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(list(self._items))
+
+    def sync(self, snapshot):
+        table = snapshot.table(self.title)
+        if table is not self._table:
+            self._table = table
+            self._items = [
+                item for item in PENDING_ITEMS[self.title](table)
+                if item.status.lower() == "pending"
+            ]
+        return self
+
+    def decide(self, row):
+        self._items = [item for item in self._items if item.row != row]
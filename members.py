@@ -0,0 +1,98 @@
+"""
+Discord user lookups with a local TTL cache.
+
+Mentions and review prompts resolve the same handful of registered users
+over and over; caching them keeps repeat lookups off Discord's REST API.
+"""
+import asyncio
+import os
+import time
+from collections import OrderedDict
+
+import discord
+
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "3600"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "1024"))
+
+# Gateway member requests accept at most 100 user IDs each
+MEMBER_CHUNK = 100
+# Concurrent fetch_user calls; discord.py still honours the REST rate limits
+FETCH_CONCURRENCY = int(os.getenv("FETCH_CONCURRENCY", "5"))
+
+
+class UserCache:
+    """Discord ID -> User, least recently used evicted, entries expire after `ttl`"""
+
+    def __init__(self, bot, ttl=USER_CACHE_TTL, maxsize=USER_CACHE_SIZE):
+        self.bot = bot
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._users = OrderedDict()  # id -> (expires_at, user)
+
+    def put(self, user):
+        self._users[user.id] = (time.monotonic() + self.ttl, user)
+        self._users.move_to_end(user.id)
+        while len(self._users) > self.maxsize:
+            self._users.popitem(last=False)
+
+    def peek(self, user_id):
+        """Cached user or None; never touches the network"""
+        entry = self._users.get(user_id)
+        if entry is None:
+            return None
+        expires_at, user = entry
+        if expires_at < time.monotonic():
+            del self._users[user_id]
+            return None
+        self._users.move_to_end(user_id)
+        return user
+
+    async def get_many(self, user_ids, guild=None):
+        """
+        Resolve many users up front: cache and guild member cache first, then
+        gateway member requests in chunks of 100, then concurrent fetch_user
+        for whoever is left (users no longer in the guild). Returns id -> User,
+        or None for IDs Discord does not know or could not be fetched.
+        """
+        users, missing = {}, []
+        for user_id in dict.fromkeys(int(u) for u in user_ids):
+            user = self.peek(user_id) or (guild and guild.get_member(user_id))
+            if user:
+                users[user_id] = user
+            else:
+                missing.append(user_id)
+
+        if guild and missing:
+            chunks = [missing[i:i + MEMBER_CHUNK] for i in range(0, len(missing), MEMBER_CHUNK)]
+            results = await asyncio.gather(
+                *(guild.query_members(user_ids=chunk, limit=MEMBER_CHUNK, cache=True) for chunk in chunks),
+                return_exceptions=True,
+            )
+            for result in results:
+                if isinstance(result, Exception):
+                    print(f"⚠️  Member query failed, falling back to fetch_user: {result}")
+                    continue
+                for member in result:
+                    users[member.id] = member
+            missing = [user_id for user_id in missing if user_id not in users]
+
+        if missing:
+            limit = asyncio.Semaphore(FETCH_CONCURRENCY)
+
+            async def fetch(user_id):
+                async with limit:
+                    try:
+                        return await self.bot.fetch_user(user_id)
+                    except discord.HTTPException as e:
+                        # One bad lookup must not sink the rest; callers fall back to <@id>
+                        if not isinstance(e, discord.NotFound):
+                            print(f"⚠️  fetch_user({user_id}) failed: {e}")
+                        return None
+
+            for user_id, user in zip(missing, await asyncio.gather(*(fetch(u) for u in missing))):
+                users[user_id] = user
+
+        for user in users.values():
+            if user is not None:
+                self.put(user)
+        return users
@@ -0,0 +1,115 @@
+"""
+Optional local SQLite mirror of Match History.
+
+Enabled by setting SQLITE_MIRROR_PATH (a file path, or ":memory:"). The
+mirror is rebuilt from the shared snapshot whenever Match History (or the
+alias table) is re-downloaded, and player / pair / status lookups then run as indexed queries on integer
+player IDs instead of Python scans over every row.
+"""
+import asyncio
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+from league import directory, pair_key
+from sheets import Match
+
+SQLITE_MIRROR_PATH = os.getenv("SQLITE_MIRROR_PATH", "")
+
+# The mirror is a disposable cache, so it is recreated on every start
+SCHEMA = """
+DROP TABLE IF EXISTS matches;
+CREATE TABLE matches (
+    row      INTEGER PRIMARY KEY,
+    player_a TEXT NOT NULL,
+    score    TEXT NOT NULL,
+    player_b TEXT NOT NULL,
+    match_id TEXT NOT NULL,
+    status   TEXT NOT NULL,
+    a_id     INTEGER,
+    b_id     INTEGER,
+    pair_lo  INTEGER,
+    pair_hi  INTEGER,
+    a_key    TEXT NOT NULL,
+    b_key    TEXT NOT NULL
+);
+CREATE INDEX idx_matches_a ON matches (a_id, row);
+CREATE INDEX idx_matches_b ON matches (b_id, row);
+CREATE INDEX idx_matches_pair ON matches (pair_lo, pair_hi, row);
+"""
+
+MATCH_COLUMNS = "row, player_a, score, player_b, match_id, status"
+
+
+class MatchMirror:
+    """SQLite copy of Match History; every query runs on one dedicated thread"""
+
+    def __init__(self, path):
+        self.path = path
+        self._source = None  # (Match History, Player Aliases) tables last loaded
+        # sqlite3 connections are bound to the thread that created them
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mirror")
+        self._conn = None
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def _connect(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path)
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    # === SYNC ===
+    def _load(self, matches, players):
+        conn = self._connect()
+        rows = []
+        for m in matches:
+            id_a, id_b = players.id_of(m.player_a), players.id_of(m.player_b)
+            lo, hi = pair_key(id_a, id_b) if id_a is not None and id_b is not None else (None, None)
+            rows.append((*m, id_a, id_b, lo, hi, m.player_a.lower(), m.player_b.lower()))
+        with conn:
+            conn.execute("DELETE FROM matches")
+            conn.executemany("INSERT INTO matches VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    async def sync(self, snapshot):
+        """Reload only when Match History or the aliases changed, not on every snapshot"""
+        if snapshot.same_source(self._source):
+            return
+        source = snapshot.source()
+        await self._run(self._load, snapshot.table("Match History").matches(), directory(snapshot))
+        self._source = source
+
+    # === QUERIES ===
+    def _query(self, sql, params):
+        return [Match(*row) for row in self._connect().execute(sql, params)]
+
+    async def games_for(self, pid, name, limit=20):
+        """Newest-first games for a player: by ID via index, else name substring"""
+        if pid is not None:
+            games = await self._run(
+                self._query,
+                f"SELECT {MATCH_COLUMNS} FROM matches WHERE row IN ("
+                "SELECT row FROM matches WHERE a_id = ? "
+                "UNION SELECT row FROM matches WHERE b_id = ?"
+                ") ORDER BY row DESC LIMIT ?",
+                (pid, pid, limit),
+            )
+            if games:
+                return games
+        key = name.strip().lower()
+        return await self._run(
+            self._query,
+            f"SELECT {MATCH_COLUMNS} FROM matches "
+            "WHERE instr(a_key, ?) > 0 OR instr(b_key, ?) > 0 ORDER BY row DESC LIMIT ?",
+            (key, key, limit),
+        )
+
+    async def head_to_head(self, id_a, id_b):
+        """Every match between two player IDs, oldest first"""
+        return await self._run(
+            self._query,
+            f"SELECT {MATCH_COLUMNS} FROM matches WHERE pair_lo = ? AND pair_hi = ? ORDER BY row",
+            pair_key(id_a, id_b),
+        )
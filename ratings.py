@@ -0,0 +1,678 @@
+"""
+Local rating engine driven by Match History.
+
+Ratings are replayed from the snapshot once, then updated one match at a
+time as rows are appended or reports are accepted, so rating commands
+never wait for Sheet1's formulas or a reload. Until a replay reproduces
+Sheet1's "Current Elo", the bot keeps showing the sheet's number.
+"""
+import asyncio
+import os
+import random
+from array import array
+
+import numpy as np
+
+from league import StatsBook, directory, leaderboard, parse_score
+
+ELO_START = float(os.getenv("ELO_START", "1000"))
+ELO_K = float(os.getenv("ELO_K", "32"))
+
+# Largest gap from Sheet1's "Current Elo" that still counts as the same
+# rating (the sheet may round); beyond it commands show the sheet's number
+ELO_SHEET_TOLERANCE = float(os.getenv("ELO_SHEET_TOLERANCE", "1"))
+
+
+def is_rated(match):
+    """Accepted (not pending) and scored in X-Y form"""
+    return match.status.lower() != "pending" and parse_score(match.score) is not None
+
+
+def expected_score(rating_a, rating_b):
+    return 1.0 / (1.0 + 10 ** ((rating_b - rating_a) / 400.0))
+
+
+def match_key(match):
+    """Identity of a match that survives row shifts"""
+    return (match.match_id, match.player_a, match.score, match.player_b)
+
+
+# === RANKING ===
+class _Node:
+    __slots__ = ("key", "priority", "left", "right", "size")
+
+    def __init__(self, key):
+        self.key = key
+        self.priority = random.random()
+        self.left = self.right = None
+        self.size = 1
+
+
+def _size(node):
+    return node.size if node else 0
+
+
+def _resize(node):
+    node.size = 1 + _size(node.left) + _size(node.right)
+    return node
+
+
+def _split(node, key):
+    """(keys < key, keys >= key)"""
+    if node is None:
+        return None, None
+    if node.key < key:
+        node.right, right = _split(node.right, key)
+        return _resize(node), right
+    left, node.left = _split(node.left, key)
+    return left, _resize(node)
+
+
+def _merge(left, right):
+    """Every key in `left` sorts before every key in `right`"""
+    if left is None or right is None:
+        return left or right
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        return _resize(left)
+    right.left = _merge(left, right.left)
+    return _resize(right)
+
+
+class RankIndex:
+    """
+    Order-statistic treap of players by rating, best first. Insert, remove,
+    rank and select are all O(log n), so a rating change re-ranks one player
+    and any leaderboard page is as cheap as the first.
+    """
+
+    def __init__(self):
+        self._root = None
+
+    def __len__(self):
+        return _size(self._root)
+
+    @staticmethod
+    def _key(pid, rating):
+        return (-rating, pid)  # ties broken by ID so keys are unique
+
+    def insert(self, pid, rating):
+        key = self._key(pid, rating)
+        left, right = _split(self._root, key)
+        self._root = _merge(_merge(left, _Node(key)), right)
+
+    def remove(self, pid, rating):
+        key = self._key(pid, rating)
+        left, right = _split(self._root, key)
+        if right is not None:
+            node, rest = _split(right, (key[0], key[1] + 1))
+            right = rest if node is not None and node.key == key else _merge(node, rest)
+        self._root = _merge(left, right)
+
+    def move(self, pid, old, new):
+        if old is not None:
+            self.remove(pid, old)
+        self.insert(pid, new)
+
+    def rank(self, pid, rating):
+        """0-based position of a player (number of players rated above them)"""
+        key, node, above = self._key(pid, rating), self._root, 0
+        while node is not None:
+            if key <= node.key:
+                node = node.left
+            else:
+                above += _size(node.left) + 1
+                node = node.right
+        return above
+
+    def select(self, position):
+        """Player ID at a 0-based position"""
+        node = self._root
+        while node is not None:
+            left = _size(node.left)
+            if position < left:
+                node = node.left
+            elif position == left:
+                return node.key[1]
+            else:
+                position -= left + 1
+                node = node.right
+        raise IndexError(position)
+
+    def page(self, start, count):
+        """Player IDs at positions [start, start + count)"""
+        return [self.select(i) for i in range(start, min(start + count, len(self)))]
+
+
+# === ELO ===
+class RatingSeries:
+    """One player's rating after each rated match, with that match's delta"""
+
+    __slots__ = ("ratings", "deltas", "matches")
+
+    def __init__(self):
+        self.ratings = array("d")  # rating after the match
+        self.deltas = array("d")   # change caused by the match
+        self.matches = array("l")  # index into EloEngine.log
+
+    def __len__(self):
+        return len(self.ratings)
+
+    def append(self, rating, delta, index):
+        self.ratings.append(rating)
+        self.deltas.append(delta)
+        self.matches.append(index)
+
+
+def rated_until(matches):
+    """Number of leading matches up to and including the last rated one"""
+    for i in range(len(matches) - 1, -1, -1):
+        if is_rated(matches[i]):
+            return i + 1
+    return 0
+
+
+class EloEngine:
+    """
+    Elo ratings by player ID. A full replay costs one pass over Match History
+    and runs on a worker thread; rows appended to the sheet after that, and
+    each report accepted here, are O(1) rating updates of their two players
+    plus an O(log n) move in the ranking.
+    """
+
+    label = "Elo"
+
+    def __init__(self, k=ELO_K, start=ELO_START):
+        self.k = k
+        self.start = start
+        self.players = None
+        self.ratings = {}     # player id -> rating
+        self.games = {}       # player id -> rated games
+        self.history = {}     # player id -> RatingSeries
+        self.log = []         # rated matches in the order they were applied
+        self.deltas = {}      # sheet row -> (match_key, change for A, change for B)
+        self.stats = StatsBook()  # record / K/D / clean sheets / streak, same matches
+        self.ranking = RankIndex()
+        self.version = 0      # bumped on every change
+        self.verified = None  # ratings reproduce Sheet1's Current Elo (None: not checked yet)
+        self._source = None   # (Match History, Player Aliases) tables last synced
+        self._table = None    # Match History table last synced
+        self._cut = 0         # its matches up to the last rated one
+        self._checked = None  # (Sheet1 table, version) last compared
+        self._local = []      # matches accepted here, not yet seen in a snapshot
+        self._matrices = {}   # (version, player ids) -> win probability matrix
+        self._lock = asyncio.Lock()
+
+    def __len__(self):
+        return len(self.ratings)
+
+    def rating(self, pid):
+        return self.ratings.get(pid, self.start)
+
+    def swing(self, id_a, id_b):
+        """A's rating change if A wins, draws or loses against B"""
+        expected = expected_score(self.rating(id_a), self.rating(id_b))
+        return self.k * (1.0 - expected), self.k * (0.5 - expected), -self.k * expected
+
+    def probability_matrix(self, pids):
+        """
+        P[i][j] = chance player i beats player j, for every pair in one
+        vectorized pass. Cached until the ratings change.
+        """
+        key = (self.version, tuple(pids))
+        matrix = self._matrices.get(key)
+        if matrix is None:
+            if len(self._matrices) >= 64 or any(v != self.version for v, _ in self._matrices):
+                self._matrices = {}
+            r = np.array([self.rating(pid) for pid in pids], dtype=np.float64)
+            matrix = 1.0 / (1.0 + 10 ** ((r[None, :] - r[:, None]) / 400.0))
+            np.fill_diagonal(matrix, np.nan)
+            self._matrices[key] = matrix
+        return matrix
+
+    def describe(self, pid):
+        return f"{self.rating(pid):.1f}"
+
+    def _apply(self, match):
+        # Read-only lookups: a full replay runs this on a worker thread
+        parsed = parse_score(match.score)
+        id_a, id_b = self.players.id_of(match.player_a), self.players.id_of(match.player_b)
+        if not parsed or id_a is None or id_b is None or id_a == id_b:
+            return None
+        left, right = parsed
+        actual = 1.0 if left > right else 0.0 if left < right else 0.5
+        rating_a, rating_b = self.rating(id_a), self.rating(id_b)
+        delta = self.k * (actual - expected_score(rating_a, rating_b))
+        self.ratings[id_a] = rating_a + delta
+        self.ratings[id_b] = rating_b - delta
+        self.games[id_a] = self.games.get(id_a, 0) + 1
+        self.games[id_b] = self.games.get(id_b, 0) + 1
+
+        index = len(self.log)
+        self.log.append(match)
+        # By row: older rows have no match ID, so identical results would collide
+        self.deltas[match.row] = (match_key(match), delta, -delta)
+        self.series(id_a).append(rating_a + delta, delta, index)
+        self.series(id_b).append(rating_b - delta, -delta, index)
+        self.stats.add(id_a, id_b, left, right)
+        return delta
+
+    def _rate(self, match):
+        """Apply one match on top of the current ratings and re-rank its two players"""
+        ids = {self.players.id_of(match.player_a), self.players.id_of(match.player_b)} - {None}
+        before = {pid: self.ratings.get(pid) for pid in ids}
+        delta = self._apply(match)
+        if delta is not None:
+            for pid, old in before.items():
+                self.ranking.move(pid, old, self.ratings[pid])
+        return delta
+
+    def series(self, pid):
+        series = self.history.get(pid)
+        if series is None:
+            series = self.history[pid] = RatingSeries()
+        return series
+
+    def delta_for(self, match):
+        """(change for A, change for B) caused by the match at this row, or None"""
+        entry = self.deltas.get(match.row)
+        if entry is None or entry[0] != match_key(match):
+            return None  # row now holds a different match than was rated
+        return entry[1:]
+
+    def _replayed(self, matches, players):
+        """Every rated match into a fresh engine; runs on a worker thread"""
+        fresh = EloEngine(self.k, self.start)
+        fresh.players = players
+        for match in matches:
+            if is_rated(match):
+                fresh._apply(match)
+        # Rank once after the replay rather than on every intermediate rating
+        for pid, rating in fresh.ratings.items():
+            fresh.ranking.insert(pid, rating)
+        return fresh
+
+    def _appended(self, snapshot, table):
+        """
+        Matches after the last row rated at the previous sync, or None when
+        anything up to that row changed (edits, deletions, new aliases)
+        """
+        if self._table is None or not snapshot.same_source(self._source[1:], ("Player Aliases",)):
+            return None
+        old, new = self._table.matches(), table.matches()
+        if len(new) < self._cut or new[:self._cut] != old[:self._cut]:
+            return None
+        return new[self._cut:]
+
+    async def sync(self, snapshot):
+        """
+        Catch up with Match History if it (or the alias table) changed since
+        the last sync: appended rows are rated in place, anything else is a
+        full replay off the event loop.
+        """
+        async with self._lock:
+            if not snapshot.same_source(self._source):
+                table = snapshot.table("Match History")
+                self.players = directory(snapshot)
+                tail = self._appended(snapshot, table)
+                if tail is None:
+                    loop = asyncio.get_running_loop()
+                    fresh = await loop.run_in_executor(None, self._replayed, table.matches(), self.players)
+                    self._adopt(fresh)
+                else:
+                    self._extend(tail)
+                self._table, self._cut = table, rated_until(table.matches())
+                self._source = snapshot.source()
+                self.version += 1
+            self._check(snapshot)
+        return self
+
+    def _adopt(self, fresh):
+        """Take over a replay's state, then re-apply accepts the sheet doesn't show yet"""
+        self.ratings, self.games, self.history = fresh.ratings, fresh.games, fresh.history
+        self.log, self.deltas, self.stats = fresh.log, fresh.deltas, fresh.stats
+        self.ranking = fresh.ranking
+        if self._local:
+            seen = {match_key(m) for m in self.log}
+            self._local = [m for m in self._local if match_key(m) not in seen]
+            for match in self._local:
+                self._rate(match)
+
+    def _extend(self, tail):
+        """Rate appended rows; ones accepted here were already rated when accepted"""
+        for match in tail:
+            if not is_rated(match):
+                continue
+            key = match_key(match)
+            local = next((m for m in self._local if match_key(m) == key), None)
+            if local is not None:
+                self._local.remove(local)
+            else:
+                self._rate(match)
+
+    def _check(self, snapshot):
+        """
+        Compare with Sheet1's "Current Elo" whenever either side changed.
+        Players with accepts the sheet doesn't show yet are skipped.
+        """
+        sheet = snapshot.tables.get("Sheet1")
+        if self._checked == (sheet, self.version):
+            return
+        self._checked = (sheet, self.version)
+
+        board = leaderboard(snapshot)
+        skip = {self.players.id_of(name) for m in self._local for name in (m.player_a, m.player_b)}
+        compared = differ = 0
+        for i, pid in enumerate(board.ids):
+            if pid is None or pid in skip or not board.columns["elo"][i]:
+                continue
+            compared += 1
+            if abs(self.rating(pid) - board.elo[i]) > ELO_SHEET_TOLERANCE:
+                differ += 1
+
+        verified = compared > 0 and differ == 0
+        if verified != self.verified:
+            if not compared:
+                print("⚠️  Sheet1 has no Current Elo to check local Elo against; showing Sheet1's")
+            elif verified:
+                print(f"📈 Local Elo matches Sheet1 for {compared} player(s)")
+            else:
+                print(
+                    f"⚠️  Local Elo differs from Sheet1 for {differ} of {compared} player(s) "
+                    f"(K={self.k:g}, start={self.start:g}); showing Sheet1's Current Elo"
+                )
+        self.verified = verified
+
+    def accept(self, match):
+        """A report was accepted in review: rate it now, ahead of the sheet"""
+        self.players.add(match.player_a)
+        self.players.add(match.player_b)
+        self._local.append(match)
+        delta = self._rate(match)
+        self.version += 1
+        return delta
+
+    def reset(self):
+        """Drop local accepts (their write failed) and replay on the next sync"""
+        self._local = []
+        self._source = self._table = None
+
+    def ranked(self, start=0, count=10):
+        """Player IDs at ranks [start, start + count), best rating first"""
+        return self.ranking.page(start, count)
+
+    def rank(self, pid):
+        """0-based rank of a rated player"""
+        return self.ranking.rank(pid, self.ratings[pid])
+
+
+# === BATCH RECOMPUTE (NumPy) ===
+def encode_matches(matches, players):
+    """
+    Rated matches as integer arrays in sheet order: player A IDs, player B
+    IDs and score margins (A minus B).
+    """
+    ids_a, ids_b, margins = [], [], []
+    for match in matches:
+        if not is_rated(match):
+            continue
+        # Read-only lookups: this may run on a worker thread, and every name
+        # in the snapshot was already registered by directory()
+        id_a, id_b = players.id_of(match.player_a), players.id_of(match.player_b)
+        if id_a is None or id_b is None or id_a == id_b:
+            continue
+        left, right = parse_score(match.score)
+        ids_a.append(id_a)
+        ids_b.append(id_b)
+        margins.append(left - right)
+    return (
+        np.array(ids_a, dtype=np.int32),
+        np.array(ids_b, dtype=np.int32),
+        np.array(margins, dtype=np.int32),
+    )
+
+
+def schedule_waves(ids_a, ids_b):
+    """
+    Group matches into waves that share no player, in order: a match lands
+    one wave after the latest wave of either player. Each wave can then be
+    rated in one vectorized step with exactly the sequential result.
+    """
+    last = {}
+    waves = np.empty(len(ids_a), dtype=np.int32)
+    for i, (a, b) in enumerate(zip(ids_a.tolist(), ids_b.tolist())):
+        wave = max(last.get(a, -1), last.get(b, -1)) + 1
+        last[a] = last[b] = waves[i] = wave
+    return waves
+
+
+def elo_sweep(ids_a, ids_b, margins, n_players, ks, starts):
+    """
+    Replay every match under every (K, start) pair at once. Returns
+    (params, ratings, brier, accuracy): ratings is params x players, and the
+    scores measure how well pre-match ratings predicted each result.
+    """
+    params = [(k, start) for k in ks for start in starts]
+    k = np.array([p[0] for p in params], dtype=np.float64)[:, None]
+    ratings = np.repeat(np.array([p[1] for p in params], dtype=np.float64)[:, None], n_players, axis=1)
+    actual = (np.sign(margins) + 1) / 2.0
+
+    brier = np.zeros(len(params))
+    correct = np.zeros(len(params))
+    decisive = int(np.count_nonzero(margins))
+
+    waves = schedule_waves(ids_a, ids_b)
+    order = np.argsort(waves, kind="stable")
+    bounds = np.searchsorted(waves[order], np.arange(waves.max() + 2 if len(waves) else 1))
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        idx = order[lo:hi]
+        a, b, s = ids_a[idx], ids_b[idx], actual[idx]
+        expected = 1.0 / (1.0 + 10 ** ((ratings[:, b] - ratings[:, a]) / 400.0))
+        brier += ((expected - s) ** 2).sum(axis=1)
+        correct += (((expected > 0.5) & (s == 1.0)) | ((expected < 0.5) & (s == 0.0))).sum(axis=1)
+        delta = k * (s - expected)
+        ratings[:, a] += delta
+        ratings[:, b] -= delta
+
+    n = max(len(margins), 1)
+    return params, ratings, brier / n, correct / max(decisive, 1)
+
+
+def sweep_report(matches, players, ks, starts):
+    """Full recompute under each parameter set, as plain data for the bot to format"""
+    ids_a, ids_b, margins = encode_matches(matches, players)
+    played = np.union1d(ids_a, ids_b)
+    params, ratings, brier, accuracy = elo_sweep(ids_a, ids_b, margins, len(players), ks, starts)
+    return {
+        "matches": len(margins),
+        "params": params,
+        "brier": brier.tolist(),
+        "accuracy": accuracy.tolist(),
+        "players": played.tolist(),
+        "ratings": ratings[:, played].tolist(),
+    }
+
+
+# === GLICKO-2 ===
+# Match History has no dates, so a rating period is a run of N rated matches
+GLICKO_PERIOD_MATCHES = int(os.getenv("GLICKO_PERIOD_MATCHES", "50"))
+GLICKO_TAU = float(os.getenv("GLICKO_TAU", "0.5"))
+GLICKO_START = 1500.0
+GLICKO_START_RD = 350.0
+GLICKO_START_VOLATILITY = 0.06
+GLICKO_SCALE = 173.7178
+
+# Which engine playerelo / top10 / rank / leaderboard read: "elo" or "glicko"
+LADDER_MODE = os.getenv("LADDER_MODE", "elo").lower()
+
+
+def glicko2(ids_a, ids_b, margins, n_players, period=GLICKO_PERIOD_MATCHES, tau=GLICKO_TAU):
+    """
+    Glicko-2 over consecutive rating periods of `period` matches. Every
+    player's update within a period is computed at once from the ratings
+    at the start of that period. Returns (rating, deviation, volatility)
+    arrays on the familiar 1500 / 350 scale.
+    """
+    mu = np.zeros(n_players)
+    phi = np.full(n_players, GLICKO_START_RD / GLICKO_SCALE)
+    sigma = np.full(n_players, GLICKO_START_VOLATILITY)
+    seen = np.zeros(n_players, dtype=bool)
+    actual = (np.sign(margins) + 1) / 2.0
+    tau2 = tau * tau
+
+    for lo in range(0, len(margins), max(period, 1)):
+        hi = lo + max(period, 1)
+        # Both perspectives of every game: (player, opponent, score)
+        me = np.concatenate((ids_a[lo:hi], ids_b[lo:hi]))
+        opp = np.concatenate((ids_b[lo:hi], ids_a[lo:hi]))
+        s = np.concatenate((actual[lo:hi], 1.0 - actual[lo:hi]))
+
+        g = 1.0 / np.sqrt(1.0 + 3.0 * phi[opp] ** 2 / np.pi ** 2)
+        e = 1.0 / (1.0 + np.exp(-g * (mu[me] - mu[opp])))
+        inv_v = np.bincount(me, weights=g * g * e * (1.0 - e), minlength=n_players)
+        gain = np.bincount(me, weights=g * (s - e), minlength=n_players)
+
+        played = np.nonzero(inv_v > 0)[0]
+        seen[np.unique(me)] = True
+        v = 1.0 / inv_v[played]
+        delta = v * gain[played]
+        p2 = phi[played] ** 2
+        a = np.log(sigma[played] ** 2)
+
+        def f(x):
+            ex = np.exp(x)
+            return ex * (delta ** 2 - p2 - v - ex) / (2.0 * (p2 + v + ex) ** 2) - (x - a) / tau2
+
+        # New volatility: Illinois root-finding, all players of the period together
+        big = delta ** 2 > p2 + v
+        A = a.copy()
+        B = np.where(big, np.log(np.where(big, delta ** 2 - p2 - v, 1.0)), a - tau)
+        todo = ~big
+        for _ in range(100):
+            if not todo.any():
+                break
+            low = todo & (f(B) < 0)
+            B = np.where(low, B - tau, B)
+            todo = low
+        fa, fb = f(A), f(B)
+        for _ in range(100):
+            open_ = np.abs(B - A) > 1e-6
+            if not open_.any():
+                break
+            C = A + (A - B) * fa / (fb - fa)
+            fc = f(C)
+            swap = fc * fb <= 0
+            A = np.where(open_, np.where(swap, B, A), A)
+            fa = np.where(open_, np.where(swap, fb, fa / 2.0), fa)
+            B = np.where(open_, C, B)
+            fb = np.where(open_, fc, fb)
+        new_sigma = np.exp(A / 2.0)
+
+        # Idle players' deviation grows with time; players update from their games
+        new_phi = 1.0 / np.sqrt(1.0 / (phi[played] ** 2 + new_sigma ** 2) + 1.0 / v)
+        phi = np.where(seen, np.sqrt(phi ** 2 + sigma ** 2), phi)
+        mu[played] += new_phi ** 2 * gain[played]
+        phi[played] = new_phi
+        sigma[played] = new_sigma
+
+    return GLICKO_START + GLICKO_SCALE * mu, GLICKO_SCALE * phi, sigma
+
+
+class GlickoEngine:
+    """
+    Glicko-2 rating, deviation and volatility by player ID. Recomputed in
+    full (vectorized per period, on a worker thread) whenever Match History
+    or an accept changes the match list; reads in between are plain dict
+    lookups.
+    """
+
+    label = "Glicko-2"
+
+    def __init__(self, period=GLICKO_PERIOD_MATCHES, tau=GLICKO_TAU):
+        self.period = period
+        self.tau = tau
+        self.players = None
+        self.ratings = {}       # player id -> rating
+        self.deviations = {}    # player id -> rating deviation (RD)
+        self.volatilities = {}  # player id -> volatility
+        self.games = {}
+        self.ranking = RankIndex()
+        self._source = None
+        self._local = []        # matches accepted here, not yet seen in a snapshot
+        self._dirty = False
+        self._lock = asyncio.Lock()
+
+    def __len__(self):
+        return len(self.ratings)
+
+    def rating(self, pid):
+        return self.ratings.get(pid, GLICKO_START)
+
+    def deviation(self, pid):
+        return self.deviations.get(pid, GLICKO_START_RD)
+
+    def describe(self, pid):
+        """Rating with its ~95% interval (two deviations)"""
+        return f"{self.rating(pid):.1f} ± {2 * self.deviation(pid):.0f}"
+
+    def _computed(self, matches, local, players):
+        """
+        Glicko-2 over the sheet's rated matches plus local accepts, into a
+        fresh engine; runs on a worker thread. Also returns the keys of the
+        local accepts the sheet already shows.
+        """
+        rated = [m for m in matches if is_rated(m)]
+        seen = {match_key(m) for m in rated}
+        shown = {match_key(m) for m in local if match_key(m) in seen}
+        local = [m for m in local if match_key(m) not in seen]
+
+        ids_a, ids_b, margins = encode_matches(rated + local, players)
+        rating, rd, volatility = glicko2(ids_a, ids_b, margins, len(players), self.period, self.tau)
+        games = np.bincount(np.concatenate((ids_a, ids_b)), minlength=len(players))
+        played = np.nonzero(games)[0].tolist()
+
+        state = GlickoEngine(self.period, self.tau)
+        state.ratings = dict(zip(played, rating[played].tolist()))
+        state.deviations = dict(zip(played, rd[played].tolist()))
+        state.volatilities = dict(zip(played, volatility[played].tolist()))
+        state.games = dict(zip(played, games[played].tolist()))
+        for pid, r in state.ratings.items():
+            state.ranking.insert(pid, r)
+        return shown, state
+
+    async def sync(self, snapshot):
+        """Recompute if Match History / aliases changed or a report was accepted"""
+        async with self._lock:
+            if snapshot.same_source(self._source) and not self._dirty:
+                return self
+
+            source = snapshot.source()
+            self.players = directory(snapshot)
+            self._dirty = False  # an accept during the recompute sets it again
+            loop = asyncio.get_running_loop()
+            shown, state = await loop.run_in_executor(
+                None, self._computed, snapshot.table("Match History").matches(),
+                list(self._local), self.players,
+            )
+            # Local accepts the sheet now shows are counted from there
+            self._local = [m for m in self._local if match_key(m) not in shown]
+            self.ratings, self.deviations = state.ratings, state.deviations
+            self.volatilities, self.games = state.volatilities, state.games
+            self.ranking = state.ranking
+            self._source = source
+        return self
+
+    def accept(self, match):
+        """Count an accepted report from the next read on"""
+        self._local.append(match._replace(status="Accepted"))
+        self._dirty = True
+
+    def reset(self):
+        self._local = []
+        self._source = None
+
+    def ranked(self, start=0, count=10):
+        return self.ranking.page(start, count)
+
+    def rank(self, pid):
+        return self.ranking.rank(pid, self.ratings[pid])
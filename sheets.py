@@ -0,0 +1,638 @@
+"""
+Google Sheets access layer for the 1v1 Rankings bot.
+
+gspread is a blocking library, so every call the bot makes goes through a
+small, bounded thread pool here instead of running on the discord.py event
+loop. Commands await these wrappers and keep the gateway responsive.
+
+All calls also pass through one scheduler that paces them to the Sheets
+per-minute quota, serves interactive commands before admin bulk work and
+lets concurrent identical reads share a single request.
+"""
+import asyncio
+import contextvars
+import functools
+import hashlib
+import heapq
+import itertools
+import json
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from gspread.exceptions import APIError, WorksheetNotFound
+from gspread.utils import absolute_range_name, fill_gaps, numericise_all
+from requests.adapters import HTTPAdapter
+
+# Max number of Sheets requests in flight at once
+SHEETS_WORKERS = int(os.getenv("SHEETS_WORKERS", "4"))
+
+# Sheets allows 60 requests per minute per service account by default
+SHEETS_QUOTA_PER_MINUTE = float(os.getenv("SHEETS_QUOTA_PER_MINUTE", "60"))
+SHEETS_BURST = int(os.getenv("SHEETS_BURST", "10"))
+
+# Seconds a cached tab may be served before a read downloads it again
+# (only while the background refresher is not running)
+SHEETS_CACHE_TTL = float(os.getenv("SHEETS_CACHE_TTL", "60"))
+
+# Seconds before the background refresher re-downloads a tab whose probe
+# never moved: a safety net for edits outside the probe range
+SHEETS_RESYNC_TTL = float(os.getenv("SHEETS_RESYNC_TTL", "900"))
+
+# Tabs kept in the shared read snapshot (every tab the bot touches)
+SNAPSHOT_TABS = (
+    "Sheet1",
+    "Match History",
+    "SKPL Standings",
+    "SKPL Stats",
+    "Pending Registrations",
+    "Pending Name Changes",
+)
+
+# Tabs the bot uses only when the spreadsheet has them
+OPTIONAL_TABS = ("Player Aliases",)
+
+# Seconds between background change checks (0 disables the refresher)
+SHEETS_POLL_INTERVAL = float(os.getenv("SHEETS_POLL_INTERVAL", "30"))
+
+# Narrow range per tab whose checksum reveals most edits without downloading
+# the tab; SHEETS_RESYNC_TTL still catches edits outside it
+TAB_PROBES = {
+    "Sheet1": "A:C",                 # Player + Current Elo
+    "Match History": "E:E",          # Status grows on report, flips on review
+    "SKPL Standings": "A:K",
+    "SKPL Stats": "A:C",
+    "Pending Registrations": "C:C",  # Status
+    "Pending Name Changes": "D:D",   # Status
+    "Player Aliases": "A:B",
+}
+
+# Tabs whose formulas are computed from another tab
+TAB_DEPENDENTS = {
+    "Match History": ("Sheet1",),
+}
+
+_executor = ThreadPoolExecutor(max_workers=SHEETS_WORKERS, thread_name_prefix="sheets")
+
+
+def pool_session(client, size=SHEETS_WORKERS):
+    """Give the client's HTTP session one keep-alive connection per Sheets worker"""
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size)
+    client.session.mount("https://", adapter)
+    return client
+
+
+# === REQUEST SCHEDULER ===
+# Lower value = served first
+INTERACTIVE, BACKGROUND, BULK = 0, 1, 2
+
+# Priority of the Sheets calls made by the current task (set per command)
+request_priority = contextvars.ContextVar("sheets_priority", default=INTERACTIVE)
+
+
+class SheetsScheduler:
+    """
+    Token bucket in front of the Sheets executor.
+    Callers wait for a token in priority order; reads submitted with a
+    flight_key join an identical request that is already in flight.
+    """
+
+    def __init__(self, per_minute=SHEETS_QUOTA_PER_MINUTE, burst=SHEETS_BURST, retries=3):
+        self.rate = per_minute / 60.0
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.retries = retries
+        self._updated = time.monotonic()
+        self._waiters = []  # heap of (priority, seq, future)
+        self._seq = itertools.count()
+        self._timer = None
+        self._inflight = {}  # flight_key -> task
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _dispatch(self):
+        self._refill()
+        while self._waiters and self.tokens >= 1:
+            _, _, waiter = heapq.heappop(self._waiters)
+            if waiter.done():
+                continue  # caller gave up while queued
+            self.tokens -= 1
+            waiter.set_result(None)
+
+        if self._waiters and self._timer is None:
+            delay = max(1 - self.tokens, 0) / self.rate
+            self._timer = asyncio.get_running_loop().call_later(delay, self._on_timer)
+
+    def _on_timer(self):
+        self._timer = None
+        self._dispatch()
+
+    async def _acquire(self, priority):
+        self._refill()
+        if not self._waiters and self.tokens >= 1:
+            self.tokens -= 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), waiter))
+        self._dispatch()
+        await waiter
+
+    def _throttled(self):
+        """The server says we're over quota: empty the bucket for everyone"""
+        self._refill()
+        self.tokens = min(self.tokens, 0.0)
+
+    async def _execute(self, func, args, kwargs, priority):
+        loop = asyncio.get_running_loop()
+        call = functools.partial(func, *args, **kwargs)
+        for attempt in range(self.retries + 1):
+            await self._acquire(priority)
+            try:
+                return await loop.run_in_executor(_executor, call)
+            except APIError as e:
+                # 429s are rejected before they apply, so retrying is safe
+                if e.response.status_code != 429 or attempt == self.retries:
+                    raise
+                self._throttled()
+                await asyncio.sleep(2 ** attempt)
+
+    async def submit(self, func, *args, flight_key=None, priority=None, **kwargs):
+        if priority is None:
+            priority = request_priority.get()
+        if flight_key is None:
+            return await self._execute(func, args, kwargs, priority)
+
+        task = self._inflight.get(flight_key)
+        if task is None:
+            task = asyncio.ensure_future(self._execute(func, args, kwargs, priority))
+            self._inflight[flight_key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(flight_key, None))
+        # shield: one caller timing out must not cancel the shared request
+        return await asyncio.shield(task)
+
+
+scheduler = SheetsScheduler()
+
+
+async def run_sheets(func, *args, **kwargs):
+    """Run a blocking gspread call through the scheduler and await the result"""
+    return await scheduler.submit(func, *args, **kwargs)
+
+
+# Sheets API errors that mean a cached tab handle no longer matches the layout
+STALE_LAYOUT_ERRORS = ("Unable to parse range", "No grid with id")
+
+
+class AsyncWorksheet:
+    """Awaitable wrapper around a gspread Worksheet"""
+
+    def __init__(self, worksheet, registry=None):
+        self.worksheet = worksheet
+        self.registry = registry
+
+    @property
+    def title(self):
+        return self.worksheet.title
+
+    async def _call(self, func, *args, **kwargs):
+        try:
+            return await run_sheets(func, *args, **kwargs)
+        except APIError as e:
+            # Tab was renamed/deleted behind our back: resolve it again next time
+            if self.registry and any(msg in str(e) for msg in STALE_LAYOUT_ERRORS):
+                self.registry.forget()
+            raise
+
+    async def get_all_values(self):
+        return await self._call(
+            self.worksheet.get_all_values, flight_key=(self.worksheet.id, "get_all_values")
+        )
+
+    async def get_all_records(self):
+        return await self._call(
+            self.worksheet.get_all_records, flight_key=(self.worksheet.id, "get_all_records")
+        )
+
+    async def col_values(self, col):
+        return await self._call(
+            self.worksheet.col_values, col, flight_key=(self.worksheet.id, "col_values", col)
+        )
+
+    async def update(self, range_name, values):
+        return await self._call(self.worksheet.update, range_name, values)
+
+    async def update_cell(self, row, col, value):
+        return await self._call(self.worksheet.update_cell, row, col, value)
+
+    async def append_row(self, values, **kwargs):
+        return await self._call(self.worksheet.append_row, values, **kwargs)
+
+    async def append_rows(self, values, **kwargs):
+        return await self._call(self.worksheet.append_rows, values, **kwargs)
+
+    async def delete_rows(self, index):
+        return await self._call(self.worksheet.delete_rows, index)
+
+
+class WorksheetRegistry:
+    """
+    Tab handles for the whole spreadsheet, resolved with one metadata fetch.
+    Lookups are answered from memory; the layout is only fetched again when
+    a title is unknown or a handle turns out to be stale.
+    """
+
+    def __init__(self, spreadsheet):
+        self.spreadsheet = spreadsheet
+        self._handles = {}
+        self._lock = asyncio.Lock()
+
+    def __contains__(self, title):
+        return title in self._handles
+
+    @property
+    def loaded(self):
+        return bool(self._handles)
+
+    def forget(self):
+        self._handles = {}
+
+    async def load(self):
+        async with self._lock:
+            worksheets = await run_sheets(self.spreadsheet.worksheets, flight_key="worksheets")
+            self._handles = {ws.title: AsyncWorksheet(ws, self) for ws in worksheets}
+            print(f"📑 Resolved {len(self._handles)} worksheet(s): {', '.join(self._handles)}")
+
+    async def get(self, title):
+        handle = self._handles.get(title)
+        if handle is None:
+            await self.load()
+            handle = self._handles.get(title)
+            if handle is None:
+                raise WorksheetNotFound(title)
+        return handle
+
+
+class AsyncSpreadsheet:
+    """Awaitable wrapper around a gspread Spreadsheet"""
+
+    def __init__(self, sheet1):
+        # Built from the already-opened Sheet1 handle so no extra fetch is needed
+        self.spreadsheet = sheet1.spreadsheet
+        self.registry = WorksheetRegistry(self.spreadsheet)
+        self.sheet1 = AsyncWorksheet(sheet1, self.registry)
+
+    @property
+    def title(self):
+        return self.spreadsheet.title
+
+    async def worksheet(self, title):
+        return await self.registry.get(title)
+
+    async def values_batch_update(self, data, value_input_option="RAW"):
+        """Write many ranges, across any tabs, in one request"""
+        body = {"valueInputOption": value_input_option, "data": data}
+        return await run_sheets(self.spreadsheet.values_batch_update, body)
+
+    async def batch_update(self, body):
+        return await run_sheets(self.spreadsheet.batch_update, body)
+
+    async def values_batch_get(self, ranges, params=None):
+        return await run_sheets(
+            self.spreadsheet.values_batch_get, ranges, params,
+            flight_key=("values_batch_get", tuple(ranges), json.dumps(params, sort_keys=True)),
+        )
+
+
+class TabEdits:
+    """
+    Cell writes and row deletions for one tab, buffered during an admin
+    session and committed together: one values update, then one structural
+    update that deletes rows bottom-up so earlier row numbers stay valid.
+    """
+
+    def __init__(self, title):
+        self.title = title
+        self.cells = {}        # (row, col letter) -> value
+        self.deletions = set()  # 1-based rows
+
+    def __bool__(self):
+        return bool(self.cells or self.deletions)
+
+    def set(self, row, col, value):
+        self.cells[(row, col)] = value
+
+    def delete(self, row):
+        self.deletions.add(row)
+
+    async def commit(self, spreadsheet):
+        data = [
+            {"range": absolute_range_name(self.title, f"{col}{row}"), "values": [[value]]}
+            for (row, col), value in sorted(self.cells.items())
+            if row not in self.deletions
+        ]
+        if data:
+            await spreadsheet.values_batch_update(data)
+
+        if self.deletions:
+            worksheet = await spreadsheet.worksheet(self.title)
+            requests = [
+                {"deleteDimension": {"range": {
+                    "sheetId": worksheet.worksheet.id,
+                    "dimension": "ROWS",
+                    "startIndex": row - 1,
+                    "endIndex": row,
+                }}}
+                for row in sorted(self.deletions, reverse=True)
+            ]
+            await spreadsheet.batch_update({"requests": requests})
+
+        self.cells, self.deletions = {}, set()
+
+
+# === TYPED TABLES ===
+# Column A..E of "Match History"; row is the 1-based sheet row
+Match = namedtuple("Match", "row player_a score player_b match_id status")
+# Column A..C of "Pending Registrations"
+Registration = namedtuple("Registration", "row discord_id name status")
+# Column A..D of "Pending Name Changes"
+NameChange = namedtuple("NameChange", "row discord_id old_name new_name status")
+
+
+class SheetTable:
+    """One tab's values, padded to a rectangle exactly like get_all_values()"""
+
+    kind, width = None, 0  # typed row namedtuple and how many leading cells it takes
+
+    def __init__(self, title, rows):
+        self.title = title
+        self.rows = rows
+        self._typed = None  # typed rows, parsed on first use
+
+    def __len__(self):
+        return len(self.rows)
+
+    def cell(self, row, col):
+        """0-based cell access that tolerates short rows"""
+        values = self.rows[row] if row < len(self.rows) else []
+        return values[col].strip() if col < len(values) else ""
+
+    def records(self, head=1):
+        """Same shape as Worksheet.get_all_records()"""
+        if len(self.rows) < head:
+            return []
+        keys = self.rows[head - 1]
+        return [dict(zip(keys, numericise_all(row))) for row in self.rows[head:]]
+
+    def typed(self):
+        """
+        Rows below the header as `kind` namedtuples of the first `width`
+        cells, stripped. A table never changes once built, so this is parsed
+        once and every later call returns the same tuple.
+        """
+        if self._typed is None:
+            kind, width = self.kind, self.width
+            self._typed = () if kind is None else tuple(
+                kind(i, *(row[c].strip() if c < len(row) else "" for c in range(width)))
+                for i, row in enumerate(self.rows[1:], 2)
+            )
+        return self._typed
+
+
+class MatchHistoryTable(SheetTable):
+    kind, width = Match, 5
+
+    def matches(self):
+        return self.typed()
+
+
+class RegistrationsTable(SheetTable):
+    kind, width = Registration, 3
+
+    def registrations(self):
+        return self.typed()
+
+
+class NameChangesTable(SheetTable):
+    kind, width = NameChange, 4
+
+    def name_changes(self):
+        return self.typed()
+
+
+TABLE_TYPES = {
+    "Match History": MatchHistoryTable,
+    "Pending Registrations": RegistrationsTable,
+    "Pending Name Changes": NameChangesTable,
+}
+
+
+def make_table(title, rows):
+    return TABLE_TYPES.get(title, SheetTable)(title, rows)
+
+
+def build_tables(titles, value_ranges):
+    """Tables from a values:batchGet response, typed rows parsed up front"""
+    tables = {}
+    for title, value_range in zip(titles, value_ranges):
+        table = tables[title] = make_table(title, fill_gaps(value_range.get("values", [])))
+        table.typed()
+    return tables
+
+
+async def fetch_tables(spreadsheet, titles):
+    """
+    Download several whole tabs with a single values:batchGet request.
+    Tabs the spreadsheet doesn't have come back empty instead of failing
+    the whole batch.
+    """
+    registry = spreadsheet.registry
+    if not registry.loaded:
+        await registry.load()
+    tables = {title: make_table(title, []) for title in titles if title not in registry}
+    titles = [title for title in titles if title in registry]
+    if not titles:
+        return tables
+
+    ranges = [absolute_range_name(title) for title in titles]
+    try:
+        response = await spreadsheet.values_batch_get(ranges)
+    except APIError as e:
+        # A missing tab makes the whole batch fail with an unparsable range
+        if "Unable to parse range" in str(e):
+            spreadsheet.registry.forget()
+            raise WorksheetNotFound(str(e)) from e
+        raise
+
+    # Padding and parsing a long Match History is real CPU work: off the event loop
+    loop = asyncio.get_running_loop()
+    tables.update(await loop.run_in_executor(None, build_tables, titles, response.get("valueRanges", [])))
+    return tables
+
+
+# === SHARED READ SNAPSHOT ===
+def checksum(values):
+    return hashlib.blake2b(json.dumps(values).encode(), digest_size=16).hexdigest()
+
+
+# Tabs every view built from Match History depends on (names resolve through aliases)
+MATCH_SOURCES = ("Match History", "Player Aliases")
+
+
+class Snapshot:
+    """Immutable set of tables captured from the spreadsheet"""
+
+    def __init__(self, version, tables):
+        self.version = version
+        self.tables = tables  # title -> SheetTable
+        self._derived = {}
+
+    def derive(self, key, build):
+        """Build an index from this snapshot once and reuse it until the next refresh"""
+        if key not in self._derived:
+            self._derived[key] = build(self)
+        return self._derived[key]
+
+    def table(self, title):
+        return self.tables.get(title) or make_table(title, [])
+
+    def source(self, titles=MATCH_SOURCES):
+        """The table objects behind `titles`; a re-downloaded tab gets a new one"""
+        return tuple(self.tables.get(title) for title in titles)
+
+    def same_source(self, source, titles=MATCH_SOURCES):
+        """True when none of `titles` was re-downloaded since `source` was taken"""
+        return source is not None and all(a is b for a, b in zip(self.source(titles), source))
+
+    def values(self, title):
+        return self.table(title).rows
+
+    def records(self, title, head=1):
+        return self.table(title).records(head)
+
+
+class SnapshotCache:
+    """
+    Process-wide read-through cache of the spreadsheet.
+    Reads are served from memory until a write invalidates a tab; only
+    stale tabs are downloaded again. While the background refresher is
+    polling, it alone reloads tabs that changed or outlived the resync TTL,
+    so reads never wait on that. Without it, reads reload tabs past the TTL.
+    """
+
+    def __init__(self, spreadsheet, tabs=SNAPSHOT_TABS + OPTIONAL_TABS, ttl=SHEETS_CACHE_TTL,
+                 resync=SHEETS_RESYNC_TTL, poll_interval=SHEETS_POLL_INTERVAL):
+        self.spreadsheet = spreadsheet
+        self.tabs = tuple(tabs)
+        self.ttl = ttl
+        self.resync = resync
+        self.poll_interval = poll_interval
+        self._snapshot = Snapshot(0, {})
+        self._fetched_at = {}  # title -> monotonic time of last download
+        self._writes = {}  # title -> invalidation counter
+        self._digests = {}  # title -> checksum of its probe range
+        self._polled_at = float("-inf")  # monotonic time of the last successful poll
+        self._lock = asyncio.Lock()
+
+    @property
+    def version(self):
+        return self._snapshot.version
+
+    @property
+    def current(self):
+        """The snapshot in memory right now, without refreshing anything"""
+        return self._snapshot
+
+    def _present_tabs(self):
+        """Configured tabs the spreadsheet has (before the layout is known: all but optional ones)"""
+        registry = self.spreadsheet.registry
+        if not registry.loaded:
+            return [t for t in self.tabs if t not in OPTIONAL_TABS]
+        return [t for t in self.tabs if t in registry]
+
+    def _polling(self):
+        """The background refresher has polled recently and is keeping tabs current"""
+        return self.poll_interval > 0 and time.monotonic() - self._polled_at < 3 * self.poll_interval
+
+    def _stale_tabs(self, ttl):
+        """Tabs older than `ttl`; never-downloaded and invalidated tabs always are"""
+        now = time.monotonic()
+        return [
+            title for title in self._present_tabs()
+            if now - self._fetched_at.get(title, float("-inf")) >= ttl
+        ]
+
+    def invalidate(self, *titles):
+        """Mark tabs (default: all of them) as needing a fresh download"""
+        for title in titles or self.tabs:
+            self._fetched_at.pop(title, None)
+            self._writes[title] = self._writes.get(title, 0) + 1
+
+    async def get(self):
+        """
+        Return the current snapshot, first downloading tabs a write
+        invalidated (and, with no refresher polling, tabs past the TTL)
+        """
+        ttl = float("inf") if self._polling() else self.ttl
+        if not self._stale_tabs(ttl):
+            return self._snapshot
+
+        async with self._lock:
+            # Another command may have refreshed while we waited for the lock
+            stale = self._stale_tabs(ttl)
+            if stale:
+                await self._refresh(stale)
+            return self._snapshot
+
+    async def poll(self):
+        """
+        Checksum a small probe range of every tab in one batched read and
+        download only the tabs whose checksum moved, plus any the resync TTL
+        says are due. Returns the refreshed titles.
+
+        Probes only cover some columns, so an unchanged probe never extends a
+        tab's download time; edits outside the probe are picked up at resync.
+        """
+        if not self.spreadsheet.registry.loaded:
+            await self.spreadsheet.registry.load()
+        titles = self._present_tabs()
+        ranges = [absolute_range_name(t, TAB_PROBES.get(t, "A:A")) for t in titles]
+        response = await self.spreadsheet.values_batch_get(ranges)
+
+        due = set(self._stale_tabs(self.resync))
+        changed, digests = [], {}
+        for title, value_range in zip(titles, response.get("valueRanges", [])):
+            digest = digests[title] = checksum(value_range.get("values", []))
+            if self._digests.get(title) != digest or title in due:
+                changed.append(title)
+        for title in list(changed):
+            for dependent in TAB_DEPENDENTS.get(title, ()):
+                if dependent in self.tabs and dependent not in changed:
+                    changed.append(dependent)
+
+        async with self._lock:
+            if changed:
+                await self._refresh(changed)
+            # Only remember what was seen once it is actually in the snapshot,
+            # so a failed refresh is retried on the next poll
+            self._digests.update(digests)
+        self._polled_at = time.monotonic()
+        return changed
+
+    async def _refresh(self, titles):
+        started = time.monotonic()
+        writes = {title: self._writes.get(title, 0) for title in titles}
+        fetched = await fetch_tables(self.spreadsheet, titles)
+
+        tables = dict(self._snapshot.tables)
+        tables.update(fetched)
+        # Swap in a new snapshot so readers never see a half-updated one
+        self._snapshot = Snapshot(self._snapshot.version + 1, tables)
+        for title in titles:
+            # A write that landed mid-download keeps the tab stale
+            if self._writes.get(title, 0) == writes[title]:
+                self._fetched_at[title] = started